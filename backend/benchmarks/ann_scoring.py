@@ -0,0 +1,68 @@
+"""Semantic scoring latency and recall, flat matrix vs ANN backends.
+
+Run from ``backend/``::
+
+    python -m benchmarks.ann_scoring --size 200000 --backends ivfpq hnsw
+
+The corpus and the queries are drawn around the same random cluster
+centres, so the ANN indexes see structure similar to real embeddings and
+queries land near indexed rows; recall@k is measured against the flat
+top-k. The noise around each centre is isotropic, which IVF-PQ's PCA step
+discards, so its recall falls once a cluster holds many more rows than
+the RAG_ANN_CANDIDATES it reranks (--size / --clusters).
+"""
+import argparse
+import time
+
+import numpy as np
+
+from rag.embedding_matrix import EmbeddingMatrix
+from rag.semantic_index import BACKENDS, SemanticIndex
+
+
+def clustered(rng, centres: np.ndarray, size: int) -> np.ndarray:
+    labels = rng.integers(0, len(centres), size=size)
+    return centres[labels] + 0.5 * rng.standard_normal((size, centres.shape[1]), dtype=np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--backends", nargs="+", default=["ivfpq", "hnsw"])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+    matrix = EmbeddingMatrix.from_array(clustered(rng, centres, args.size))
+    queries = clustered(rng, centres, args.queries)
+
+    flat = SemanticIndex(matrix)
+    start = time.perf_counter()
+    expected = top_k(flat.scores_many(queries), args.k)
+    flat_ms = (time.perf_counter() - start) / args.queries * 1000
+    print(f"{'backend':>8} {'build s':>9} {'ms/query':>10} {'recall@k':>9}")
+    print(f"{'flat':>8} {'-':>9} {flat_ms:>10.2f} {1.0:>9.3f}")
+
+    for name in args.backends:
+        start = time.perf_counter()
+        index = BACKENDS[name](matrix)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = top_k(index.scores_many(queries), args.k)
+        ann_ms = (time.perf_counter() - start) / args.queries * 1000
+
+        recall = np.mean([len(set(a) & set(e)) / args.k for a, e in zip(actual, expected)])
+        print(f"{name:>8} {build_s:>9.1f} {ann_ms:>10.2f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
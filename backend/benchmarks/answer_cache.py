@@ -0,0 +1,68 @@
+"""Latency of a repeated question, answered vs served from the answer cache.
+
+Run from ``backend/`` with a real key (this makes API calls)::
+
+    OPENAI_API_KEY=... python -m benchmarks.answer_cache --runs 5
+
+A throwaway session is filled with a few synthetic chunks (not persisted).
+Each question is asked once (a miss: planning, search and the answer call)
+and then again as a first turn of a fresh conversation, which is served
+from ``RagSystem.answer_cache``. A hit only costs the query-embedding cache
+lookup and one similarity scan, so it should take single-digit milliseconds.
+The LLM response cache is disabled so misses pay the real planning call.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from buddy.model.cache import ResponseCache
+from rag.rag_system import RagSystem
+
+CHUNKS = [
+    "The hybrid retriever fuses cosine similarity, BM25 and a knowledge-graph score per chunk.",
+    "Embeddings come from text-embedding-3-small and are normalized when they are stored.",
+    "BM25 uses k1 = 1.5 and b = 0.75 over the spaCy tokens of each chunk.",
+    "The knowledge graph links entities that occur in the same sentence.",
+]
+
+QUESTIONS = [
+    "How are chunks scored?",
+    "Which embedding model is used?",
+    "What BM25 parameters are used?",
+    "How is the knowledge graph built?",
+]
+
+
+def timed(rag: RagSystem, question: str) -> float:
+    rag.clear_memory()
+    start = time.perf_counter()
+    rag.chat(question)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    rag = RagSystem(api_key=os.environ["OPENAI_API_KEY"], session_id="benchmark")
+    cache_dir = tempfile.TemporaryDirectory()
+    rag.response_cache = ResponseCache(os.path.join(cache_dir.name, "llm.sqlite"), ttl=0)
+    rag.vector_db.add_documents(
+        [{"title": f"notes - Chunk {i + 1}", "content": text} for i, text in enumerate(CHUNKS)],
+        persist=False
+    )
+
+    misses = [timed(rag, question) for question in QUESTIONS]
+    hits = [timed(rag, question) for _ in range(args.runs) for question in QUESTIONS]
+
+    print(f"{'':>8} {'p50 ms':>8} {'max ms':>8}")
+    print(f"{'miss':>8} {statistics.median(misses):>8.1f} {max(misses):>8.1f}")
+    print(f"{'hit':>8} {statistics.median(hits):>8.1f} {max(hits):>8.1f}")
+    print(rag.answer_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
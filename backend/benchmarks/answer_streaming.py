@@ -0,0 +1,70 @@
+"""Time to first answer token, single completion vs ``stream=True``.
+
+Run from ``backend/`` with a real key (this makes API calls)::
+
+    OPENAI_API_KEY=... python -m benchmarks.answer_streaming --runs 5
+
+The answer request is built like ``RagSystem._prepare_answer`` builds it
+(system prompt plus a retrieved-context message) around a fixed context.
+Without streaming the first token reaches the client with the whole
+answer; with streaming, after the first delta.
+"""
+import argparse
+import os
+import statistics
+import time
+
+from models.rag import SettingsConfig
+from rag.rag_system import RagSystem
+
+CONTEXT = """
+Relevant Information:
+
+Document 1:
+The hybrid retriever scores every chunk with a weighted sum of cosine similarity over
+text-embedding-3-small vectors, BM25 over the chunk tokens and a two-hop knowledge-graph
+score over the entities that co-occur with the query entities.
+
+Document 2:
+On the evaluation set the hybrid retriever improved recall@5 from 0.71 for dense retrieval
+alone to 0.83, at the cost of a spaCy pass over every chunk at ingest.
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    rag = RagSystem(api_key=os.environ["OPENAI_API_KEY"], session_id="benchmark")
+    settings = SettingsConfig()
+    messages = [
+        {"role": "system", "content": rag._get_system_prompt()},
+        {"role": "system", "content": CONTEXT},
+        {"role": "user", "content": "Explain how the retriever ranks chunks and what it gains."}
+    ]
+    request = dict(model="gpt-4o-mini", messages=messages,
+                   temperature=settings.temperature, max_tokens=settings.max_token)
+
+    blocking, first, streamed = [], [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        rag.client.chat.completions.create(**request)
+        blocking.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        first_ms = None
+        for chunk in rag.client.chat.completions.create(**request, stream=True):
+            if first_ms is None and chunk.choices and chunk.choices[0].delta.content:
+                first_ms = (time.perf_counter() - start) * 1000
+        first.append(first_ms)
+        streamed.append((time.perf_counter() - start) * 1000)
+
+    print(f"{'':>22} {'p50 ms':>8}")
+    print(f"{'blocking, full answer':>22} {statistics.median(blocking):>8.0f}")
+    print(f"{'streamed, first token':>22} {statistics.median(first):>8.0f}")
+    print(f"{'streamed, full answer':>22} {statistics.median(streamed):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
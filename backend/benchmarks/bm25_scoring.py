@@ -0,0 +1,64 @@
+"""Keyword scoring latency and parity, rank_bm25 vs SparseBM25.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bm25_scoring --docs 100000
+"""
+import argparse
+import time
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from rag.bm25 import SparseBM25
+
+
+def synthetic_corpus(n_docs: int, vocab_size: int, doc_len: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    words = np.array([f"term{i}" for i in range(vocab_size)])
+    # Zipf-like term distribution, closer to real text than uniform
+    p = 1.0 / np.arange(1, vocab_size + 1)
+    p /= p.sum()
+    return [list(words[rng.choice(vocab_size, size=doc_len, p=p)]) for _ in range(n_docs)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--vocab", type=int, default=20_000)
+    parser.add_argument("--doc-len", type=int, default=120)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.docs, args.vocab, args.doc_len)
+    rng = np.random.default_rng(1)
+    queries = [[f"term{i}" for i in rng.integers(0, 500, size=4)] for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    legacy = BM25Okapi(corpus)
+    legacy_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = SparseBM25()
+    index.add(corpus)
+    index.get_scores(queries[0])
+    sparse_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy_scores = [legacy.get_scores(query) for query in queries]
+    legacy_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    start = time.perf_counter()
+    sparse_scores = [index.get_scores(query) for query in queries]
+    sparse_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    max_diff = max(np.max(np.abs(a - b)) for a, b in zip(legacy_scores, sparse_scores))
+
+    print(f"docs={args.docs} vocab={args.vocab} doc_len={args.doc_len}")
+    print(f"build:  rank_bm25 {legacy_build:.2f}s  sparse {sparse_build:.2f}s")
+    print(f"query:  rank_bm25 {legacy_ms:.1f}ms  sparse {sparse_ms:.2f}ms  ({legacy_ms / sparse_ms:.0f}x)")
+    print(f"max abs score difference: {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
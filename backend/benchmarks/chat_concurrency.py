@@ -0,0 +1,111 @@
+"""N simultaneous chats on one event loop, blocking ``chat`` vs ``achat``.
+
+Run from ``backend/`` with a real key (this makes API calls)::
+
+    OPENAI_API_KEY=... python -m benchmarks.chat_concurrency --chats 8
+
+Each variant gets fresh throwaway sessions, filled with a few synthetic
+chunks (not persisted) and with private, cold query-embedding and answer
+caches and the LLM response cache disabled, so neither variant is served
+from what the other one cached. The same N questions are then answered by
+N concurrent tasks on one loop, once calling the blocking
+``RagSystem.chat`` from async code (as the routes used to) and once
+awaiting ``RagSystem.achat``. A ticker task records the
+worst event-loop stall meanwhile. With ``achat`` the wall time should be
+close to the slowest single chat rather than the sum.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from buddy.model.cache import ResponseCache
+from rag.query_cache import QueryEmbeddingCache
+from rag.rag_system import RagSystem
+
+CHUNKS = [
+    "The hybrid retriever fuses cosine similarity, BM25 and a knowledge-graph score per chunk.",
+    "Embeddings come from text-embedding-3-small and are normalized when they are stored.",
+    "BM25 uses k1 = 1.5 and b = 0.75 over the spaCy tokens of each chunk.",
+    "The knowledge graph links entities that occur in the same sentence.",
+    "Query planning rewrites the question and extracts two or three search queries.",
+    "Uploads are parsed in a process pool and indexed by background ingestion jobs.",
+]
+
+QUESTIONS = [
+    "How are chunks scored?",
+    "Which embedding model is used?",
+    "What BM25 parameters are used?",
+    "How is the knowledge graph built?",
+    "What does query planning do?",
+    "How are uploads processed?",
+]
+
+
+async def ticker(stop: asyncio.Event, stalls: list):
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.01)
+        now = time.perf_counter()
+        stalls.append(now - last - 0.01)
+        last = now
+
+
+async def run(rags, questions, answer) -> tuple:
+    stop, stalls = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, stalls))
+    durations = []
+
+    async def one(rag, question):
+        start = time.perf_counter()
+        await answer(rag, question)
+        durations.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(rag, question) for rag, question in zip(rags, questions)))
+    wall = time.perf_counter() - start
+    stop.set()
+    await tick
+    return wall, durations, max(stalls, default=0.0)
+
+
+async def blocking(rag, question):
+    rag.chat(question)
+
+
+async def non_blocking(rag, question):
+    await rag.achat(question)
+
+
+def sessions(api_key: str, count: int, cache_dir: str) -> list:
+    # One session per chat, as concurrent users would have
+    rags = [RagSystem(api_key=api_key, session_id=f"benchmark-{i}") for i in range(count)]
+    for rag in rags:
+        rag.response_cache = ResponseCache(os.path.join(cache_dir, "llm.sqlite"), ttl=0)
+        rag.vector_db.query_cache = QueryEmbeddingCache()
+        rag.vector_db.add_documents(
+            [{"title": f"notes - Chunk {i + 1}", "content": text} for i, text in enumerate(CHUNKS)],
+            persist=False
+        )
+    return rags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=8)
+    args = parser.parse_args()
+
+    api_key = os.environ["OPENAI_API_KEY"]
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.chats)]
+
+    print(f"{'variant':>10} {'wall s':>7} {'slowest s':>10} {'sum s':>7} {'max stall s':>12}")
+    for name, answer in (("chat", blocking), ("achat", non_blocking)):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            rags = sessions(api_key, args.chats, cache_dir)
+            wall, durations, stall = asyncio.run(run(rags, questions, answer))
+        print(f"{name:>10} {wall:>7.2f} {max(durations):>10.2f} {sum(durations):>7.2f} {stall:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
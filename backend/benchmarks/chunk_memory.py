@@ -0,0 +1,101 @@
+"""Python heap per indexed chunk, chunk dicts vs ChunkStore spans.
+
+Run from ``backend/``::
+
+    python -m benchmarks.chunk_memory --docs 200 --doc-chars 200000
+
+Synthetic documents are cut into overlapping windows (``--chunk-chars``
+and ``--overlap``, roughly the 500/100-token windows RagSystem uses). The
+legacy layout keeps every window as a chunk dict plus a lowercased copy, as
+SimilarityMatching did; the new one keeps each document's text once and a
+ChunkStore row per window. Allocations are measured with tracemalloc.
+"""
+import argparse
+import random
+import string
+import tracemalloc
+
+from rag.chunk_store import ChunkStore
+
+
+def make_documents(count: int, chars: int):
+    rng = random.Random(0)
+    words = ["".join(rng.choices(string.ascii_letters, k=rng.randint(2, 10))) for _ in range(5000)]
+    for i in range(count):
+        text = []
+        length = 0
+        while length < chars:
+            word = rng.choice(words)
+            text.append(word)
+            length += len(word) + 1
+        yield f"doc-{i}.pdf", " ".join(text)
+
+
+def windows(text: str, size: int, overlap: int):
+    step = size - overlap
+    for ordinal, start in enumerate(range(0, len(text), step), start=1):
+        yield start, min(start + size, len(text)), size // 4, ordinal, 1, 1
+
+
+def measure(build, documents) -> int:
+    tracemalloc.start()
+    held = build(documents)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return current
+
+
+def build_dicts(documents):
+    metadata, lowered = [], []
+    for title, text, spans in documents:
+        for start, end, _, ordinal, page_start, page_end in spans:
+            content = text[start:end]
+            metadata.append({
+                "title": f"{title} - Chunk {ordinal}",
+                "content": content,
+                "page_start": page_start,
+                "page_end": page_end,
+            })
+            lowered.append(content.lower())
+    return metadata, lowered
+
+
+def build_store(documents):
+    store = ChunkStore()
+    for title, text, spans in documents:
+        store.add_spans(store.add_document(title, text), spans)
+    store.rows  # fold pending rows into the int32 table
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--doc-chars", type=int, default=200_000)
+    parser.add_argument("--chunk-chars", type=int, default=2000)
+    parser.add_argument("--overlap", type=int, default=400)
+    args = parser.parse_args()
+
+    documents = [
+        (title, text, list(windows(text, args.chunk_chars, args.overlap)))
+        for title, text in make_documents(args.docs, args.doc_chars)
+    ]
+    chunks = sum(len(spans) for _, _, spans in documents)
+
+    # Both layouts are built from texts that already exist, so neither
+    # allocation counts them; ChunkStore keeps those texts as its buffer,
+    # so their size is added to its total
+    text_bytes = sum(len(text) + 49 for _, text, _ in documents)
+    legacy = measure(build_dicts, documents)
+    spans = measure(build_store, documents) + text_bytes
+
+    print(f"{chunks} chunks from {args.docs} documents")
+    print(f"{'layout':>12} {'MB':>8} {'bytes/chunk':>12}")
+    print(f"{'chunk dicts':>12} {legacy / 2**20:>8.1f} {legacy / chunks:>12.0f}")
+    print(f"{'ChunkStore':>12} {spans / 2**20:>8.1f} {spans / chunks:>12.0f}")
+    print(f"{legacy / spans:.1f}x less memory per chunk")
+
+
+if __name__ == "__main__":
+    main()
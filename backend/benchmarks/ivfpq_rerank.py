@@ -0,0 +1,119 @@
+"""IVFPQVectorDB exact-rerank latency and peak RSS, IndexFlatIP vs RawVectorStore.
+
+Run from ``backend/``::
+
+    python -m benchmarks.ivfpq_rerank --size 200000
+
+Each variant runs in its own spawned process and reports its RSS after
+the searches and its peak RSS (``ru_maxrss``). The legacy variant holds every vector in a float32 IndexFlatIP and rebuilds
+candidates with ``reconstruct`` in a loop; the new ones gather candidates
+from a memory-mapped float16 / int8 store and select with argpartition.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+K = 3
+
+
+def make_vectors(size: int, dim: int) -> np.ndarray:
+    return np.random.default_rng(0).standard_normal((size, dim), dtype=np.float32)
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def report(queue, name, ms):
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((name, ms, rss_mb(), peak_mb))
+
+
+def run_legacy(args, tmp, queue):
+    import faiss
+
+    raw_index = faiss.IndexFlatIP(args.dim)
+    raw_index.add(make_vectors(args.size, args.dim))
+    rng = np.random.default_rng(1)
+    query = rng.standard_normal(args.dim).astype(np.float32)
+
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        candidates = rng.integers(0, args.size, size=args.pre_k)
+        vectors = np.empty((len(candidates), args.dim), dtype=np.float32)
+        for i, c in enumerate(candidates):
+            vectors[i] = raw_index.reconstruct(int(c))
+        similarities = np.dot(query.reshape(1, -1), vectors.T)[0]
+        candidates[np.argsort(-similarities)][:K]
+    report(queue, "faiss float32", (time.perf_counter() - start) / args.queries * 1000)
+
+
+def store_paths(tmp, dtype):
+    return os.path.join(tmp, f"{dtype}.npy"), os.path.join(tmp, f"{dtype}_scale.npy")
+
+
+def build_store(args, tmp, queue):
+    from rag.ivfpq import RawVectorStore
+
+    vectors = make_vectors(args.size, args.dim)
+    for dtype in ("float16", "int8"):
+        store = RawVectorStore(dtype)
+        store.add(vectors)
+        store.save(*store_paths(tmp, dtype))
+    queue.put(None)
+
+
+def run_store(args, tmp, dtype, queue):
+    from rag.ivfpq import RawVectorStore
+
+    # Only the saved store is opened here, as IVFPQVectorDB.load_db does
+    store = RawVectorStore.load(*store_paths(tmp, dtype))
+    rng = np.random.default_rng(1)
+    query = rng.standard_normal(args.dim).astype(np.float32)
+
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        candidates = rng.integers(0, args.size, size=args.pre_k)
+        similarities = store.gather(candidates) @ query
+        best = np.argpartition(-similarities, K - 1)[:K]
+        candidates[best[np.argsort(-similarities[best])]]
+    report(queue, f"mmap {dtype}", (time.perf_counter() - start) / args.queries * 1000)
+
+
+def measure(target, *target_args):
+    # Spawned, so no child inherits the parent's pages
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=target, args=(*target_args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--pre-k", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        measure(build_store, args, tmp)
+        results = [measure(run_legacy, args, tmp)]
+        results += [measure(run_store, args, tmp, dtype) for dtype in ("float16", "int8")]
+
+    print(f"{'raw store':>16} {'rerank ms':>10} {'RSS MB':>8} {'peak MB':>8}")
+    for name, ms, rss, peak in results:
+        print(f"{name:>16} {ms:>10.3f} {rss:>8.0f} {peak:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Recall/latency sweep and autotuner for IVFPQVectorDB index parameters.
+
+Run from ``backend/``, fully offline (no embedding API calls)::
+
+    python -m benchmarks.ivfpq_tune --size 100000 --target-recall 0.9
+    python -m benchmarks.ivfpq_tune --embeddings chunks.npy --db data/advance_vector_db.pkl
+
+Embeddings come from an ``.npy`` file (recorded ``(n, d)`` vectors) or are
+drawn around random cluster centres. Queries are held out from the corpus
+and the ground truth is the exact top-k by cosine. Each combination of PCA
+dimension, nlist, M and bits is built through ``IVFPQVectorDB.add`` and
+searched through ``IVFPQVectorDB.search_ids`` for every nprobe / pre_k.
+The results are recall@k, p50/p99 latency, build time and index memory.
+
+The Pareto frontier (recall up, p50 down, memory down) is printed. The
+fastest frontier config that meets ``--target-recall`` is written to
+``--out`` and, with ``--db``, into that database's ``tuned_params``, which
+``IVFPQVectorDB`` then uses for training and search.
+"""
+import argparse
+import itertools
+import json
+import time
+
+import faiss
+import numpy as np
+from rich.console import Console
+
+from rag.IVFPQVectorDB import IVFPQVectorDB
+
+
+def clustered(rng, size: int, dim: int, clusters: int = 256) -> np.ndarray:
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, size=size)
+    return centres[labels] + 0.5 * rng.standard_normal((size, dim), dtype=np.float32)
+
+
+def ground_truth(corpus: np.ndarray, queries: np.ndarray, k: int, batch: int = 256) -> np.ndarray:
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = []
+    for i in range(0, len(queries), batch):
+        scores = queries[i:i + batch] @ corpus.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        truth.extend(set(row) for row in top)
+    return truth
+
+
+def offline_db(dim: int, params: dict) -> IVFPQVectorDB:
+    # The API key is never used: vectors are added directly, not embedded
+    db = IVFPQVectorDB(
+        api_key="offline",
+        console=Console(quiet=True),
+        d=dim,
+        cache=False,
+        error_drift=float("inf"),
+        imbalance_drift=float("inf"),
+        background_retrain=False
+    )
+    db.tuned_params = params
+    return db
+
+
+def index_mb(db: IVFPQVectorDB) -> float:
+    index_bytes = faiss.serialize_index(db.index).nbytes
+    raw_bytes = db.raw_vectors.codes.nbytes
+    if db.raw_vectors.scales is not None:
+        raw_bytes += db.raw_vectors.scales.nbytes
+    return (index_bytes + raw_bytes) / 2**20
+
+
+def evaluate(db, queries, truth, k, nprobe, pre_k) -> dict:
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        ids, _ = db.search_ids(query, k, -np.inf, nprobe, pre_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(ids.tolist()) & expected)
+    return {
+        "recall": hits / (k * len(queries)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def pareto(results: list) -> list:
+    def dominates(a, b):
+        better_or_equal = (a["recall"] >= b["recall"] and a["p50_ms"] <= b["p50_ms"]
+                           and a["memory_mb"] <= b["memory_mb"])
+        strictly = (a["recall"] > b["recall"] or a["p50_ms"] < b["p50_ms"]
+                    or a["memory_mb"] < b["memory_mb"])
+        return better_or_equal and strictly
+
+    return [r for r in results if not any(dominates(other, r) for other in results)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embeddings", help="recorded (n, d) float embeddings as .npy")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--pca", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--nlist", type=int, nargs="+", default=[256, 1024, 2048])
+    parser.add_argument("--M", type=int, nargs="+", default=[8, 16])
+    parser.add_argument("--bits", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--pre-k", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--target-recall", type=float, default=0.9)
+    parser.add_argument("--out", default="ivfpq_tuned.json")
+    parser.add_argument("--db", help="IVFPQVectorDB pickle to record the chosen config in")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.embeddings:
+        vectors = np.load(args.embeddings).astype(np.float32)
+        rng.shuffle(vectors)
+    else:
+        vectors = clustered(rng, args.size + args.queries, args.dim)
+    queries, corpus = vectors[:args.queries], vectors[args.queries:]
+    dim = corpus.shape[1]
+    truth = ground_truth(corpus, queries, args.k)
+    metadata = [{}] * len(corpus)
+
+    results = []
+    print(f"{'pca':>4} {'nlist':>6} {'M':>3} {'bits':>4} {'nprobe':>6} {'pre_k':>5} "
+          f"{'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'MB':>7}")
+    for pca, nlist, m, bits in itertools.product(args.pca, args.nlist, args.M, args.bits):
+        if pca % m or nlist > len(corpus) // 4:
+            continue
+        params = {"pca_dimension": pca, "nlist": nlist, "M": m, "bits": bits, "n_vectors": len(corpus)}
+        db = offline_db(dim, params)
+        start = time.perf_counter()
+        db.add(corpus, metadata)
+        build_s = time.perf_counter() - start
+        memory_mb = index_mb(db)
+
+        for nprobe, pre_k in itertools.product(args.nprobe, args.pre_k):
+            if nprobe > nlist or pre_k < args.k:
+                continue
+            result = {**params, "nprobe": nprobe, "pre_k": pre_k, "build_s": build_s, "memory_mb": memory_mb}
+            result.update(evaluate(db, queries, truth, args.k, nprobe, pre_k))
+            results.append(result)
+            print(f"{pca:>4} {nlist:>6} {m:>3} {bits:>4} {nprobe:>6} {pre_k:>5} "
+                  f"{result['recall']:>7.3f} {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f} "
+                  f"{build_s:>8.1f} {memory_mb:>7.1f}")
+
+    frontier = sorted(pareto(results), key=lambda r: r["p50_ms"])
+    print(f"\nPareto frontier ({len(frontier)} configs):")
+    for r in frontier:
+        print(f"  recall {r['recall']:.3f}  p50 {r['p50_ms']:.3f}ms  {r['memory_mb']:.1f}MB  "
+              f"pca={r['pca_dimension']} nlist={r['nlist']} M={r['M']} bits={r['bits']} "
+              f"nprobe={r['nprobe']} pre_k={r['pre_k']}")
+
+    meeting = [r for r in frontier if r["recall"] >= args.target_recall]
+    if meeting:
+        chosen = min(meeting, key=lambda r: (r["p50_ms"], r["memory_mb"]))
+    else:
+        print(f"No config reaches recall {args.target_recall}; choosing the highest recall")
+        chosen = max(frontier, key=lambda r: (r["recall"], -r["p50_ms"]))
+
+    tuned = {key: chosen[key] for key in ("pca_dimension", "nlist", "M", "bits", "n_vectors", "nprobe", "pre_k")}
+    tuned.update({"k": args.k, "recall": chosen["recall"], "target_recall": args.target_recall})
+    with open(args.out, "w") as file:
+        json.dump(tuned, file, indent=2)
+    print(f"\nChosen: {tuned}\nWritten to {args.out}")
+    if args.db:
+        IVFPQVectorDB.write_tuned_params(args.db, tuned)
+        print(f"Recorded in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Upload extraction time, sequential vs the process pool used by RagSystem.
+
+Run from ``backend/``::
+
+    python -m benchmarks.pdf_extraction docs/*.pdf
+
+Each file is parsed and chunked with ``extract_document``, first one after
+another in this process and then across ``get_extraction_pool`` workers,
+and the two extracted documents are checked to match in upload order.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from rag.doc_processor import EXTRACTION_WORKERS, extract_document, get_extraction_pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    args = parser.parse_args()
+
+    uploads = []
+    for path in args.files:
+        with open(path, "rb") as file:
+            uploads.append((file.read(), os.path.basename(path)))
+
+    start = time.perf_counter()
+    sequential = [extract_document(content, name, args.chunk_size, args.chunk_overlap) for content, name in uploads]
+    sequential_s = time.perf_counter() - start
+
+    pool: ProcessPoolExecutor = get_extraction_pool()
+    # Warm the workers so process start-up is not counted
+    list(pool.map(len, [b""] * EXTRACTION_WORKERS))
+    start = time.perf_counter()
+    futures = [pool.submit(extract_document, content, name, args.chunk_size, args.chunk_overlap) for content, name in uploads]
+    parallel = [future.result() for future in futures]
+    parallel_s = time.perf_counter() - start
+    pool.shutdown()
+
+    assert parallel == sequential
+    chunks = sum(len(document["chunks"]) for document in sequential)
+    print(f"{len(uploads)} files, {chunks} chunks, {EXTRACTION_WORKERS} workers")
+    print(f"sequential {sequential_s:>8.2f}s")
+    print(f"pool       {parallel_s:>8.2f}s  ({sequential_s / parallel_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Memory and lookup cost of cached query embeddings, Python lists vs the shared cache.
+
+Run from ``backend/`` (no API calls; vectors are random)::
+
+    python -m benchmarks.query_cache --queries 2000
+
+The old per-session ``query_cache`` kept each 1536-dim embedding as the
+list of Python floats the API returned; ``QueryEmbeddingCache`` keeps one
+float32 array per (model, normalized query). Memory is measured with
+tracemalloc while filling each, then every query is looked up once.
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from rag.query_cache import QueryEmbeddingCache
+
+MODEL = "text-embedding-3-small"
+
+
+def measure(fill) -> tuple:
+    tracemalloc.start()
+    cache = fill()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return cache, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = [f"search query number {i}" for i in range(args.queries)]
+    vectors = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    as_lists, list_bytes = measure(lambda: {query: vector.tolist() for query, vector in zip(queries, vectors)})
+    shared, shared_bytes = measure(lambda: _filled(queries, vectors))
+
+    start = time.perf_counter()
+    for query in queries:
+        as_lists[query]
+    list_us = (time.perf_counter() - start) / len(queries) * 1e6
+    start = time.perf_counter()
+    for query in queries:
+        shared.get_many(MODEL, [query])
+    shared_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+    print(f"{'':>14} {'MiB':>8} {'lookup us':>10}")
+    print(f"{'list dict':>14} {list_bytes / 2**20:>8.1f} {list_us:>10.2f}")
+    print(f"{'shared cache':>14} {shared_bytes / 2**20:>8.1f} {shared_us:>10.2f}")
+    print(shared.stats())
+
+
+def _filled(queries, vectors) -> QueryEmbeddingCache:
+    cache = QueryEmbeddingCache(max_bytes=2**40)
+    cache.put_many(MODEL, queries, list(vectors.copy()))
+    return cache
+
+
+if __name__ == "__main__":
+    main()
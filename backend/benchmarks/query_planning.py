@@ -0,0 +1,89 @@
+"""Pre-answer latency per chat turn: separate rewrite + expansion calls vs one fused call.
+
+Run from ``backend/`` with a real key (this makes API calls)::
+
+    OPENAI_API_KEY=... python -m benchmarks.query_planning --turns 10
+
+Each turn follows a previous exchange, so the fused call also rewrites.
+The two-call variant chains a rewrite request and an expansion request the
+way ``RagSystem.chat`` did before they were fused; the fused variant is
+``RagSystem._plan_queries``, with the LLM response cache disabled so
+every call goes to the API. A first turn (no memory) is timed as well.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from buddy.model.cache import ResponseCache
+from rag.rag_system import RagSystem
+
+QUESTIONS = [
+    "How does it compare with the baseline?",
+    "What are its main limitations?",
+    "Which datasets were used for that?",
+    "How long did training take?",
+    "What would improve the results?",
+]
+
+EXCHANGE = [
+    {"role": "user", "content": "What model does the paper propose for document retrieval?"},
+    {"role": "assistant", "content": "It proposes a hybrid retriever that fuses dense embeddings, BM25 and a knowledge graph."},
+]
+
+
+def two_calls(rag: RagSystem, question: str) -> None:
+    history = f"Q: {EXCHANGE[0]['content']}\nA: {EXCHANGE[1]['content']}"
+    rewrite = rag.client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "Rewrite the question as a standalone question using the previous "
+                                          f"exchange. Respond only as <query>...</query>.\n\n{history}"},
+            {"role": "user", "content": question},
+        ],
+        temperature=0.2,
+        max_tokens=300
+    ).choices[0].message.content
+    rag.client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "Extract 2-3 short search queries of 3-5 words, one per line, "
+                                          f"inside <queries></queries>.\n\n{history}"},
+            {"role": "user", "content": f"Question: {rewrite}"},
+        ],
+        temperature=0.2,
+        max_tokens=200
+    )
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+
+    rag = RagSystem(api_key=os.environ["OPENAI_API_KEY"], session_id="benchmark")
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.turns)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        rag.response_cache = ResponseCache(os.path.join(cache_dir, "llm.sqlite"), ttl=0)
+        rag.memory = []
+        first = [timed(rag._plan_queries, question) for question in questions]
+        rag.memory = list(EXCHANGE)
+        fused = [timed(rag._plan_queries, question) for question in questions]
+        chained = [timed(two_calls, rag, question) for question in questions]
+
+    print(f"{'variant':>22} {'p50 ms':>8} {'mean ms':>8}")
+    for name, samples in (("two calls", chained), ("fused", fused), ("fused, no memory", first)):
+        print(f"{name:>22} {statistics.median(samples):>8.0f} {statistics.mean(samples):>8.0f}")
+    print(f"saved per turn: {statistics.median(chained) - statistics.median(fused):.0f} ms (p50)")
+
+
+if __name__ == "__main__":
+    main()
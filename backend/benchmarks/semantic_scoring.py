@@ -0,0 +1,59 @@
+"""Per-query semantic scoring latency, legacy vs pre-normalized matrix.
+
+Run from ``backend/``::
+
+    python -m benchmarks.semantic_scoring --sizes 10000 100000 1000000
+
+At the default 1536 dimensions the 1M-row matrix needs ~6 GB of RAM (the
+legacy path needs twice that while it renormalizes); pass ``--dim`` or
+``--skip-legacy`` on smaller machines.
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from rag.embedding_matrix import EmbeddingMatrix
+
+
+def legacy_scores(embeddings: np.ndarray, query: np.ndarray) -> np.ndarray:
+    return np.dot(normalize(embeddings, axis=1, norm='l2'),
+                  normalize(query.reshape(1, -1), axis=1, norm='l2').T).ravel()
+
+
+def time_queries(fn, queries, repeat: int) -> float:
+    fn(queries[0])
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(queries[i % len(queries)])
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((8, args.dim)).astype(np.float32)
+
+    print(f"{'chunks':>10} {'legacy ms':>12} {'matrix ms':>12} {'speedup':>9}")
+    for size in args.sizes:
+        raw = rng.standard_normal((size, args.dim), dtype=np.float32)
+        matrix = EmbeddingMatrix.from_array(raw)
+
+        new_ms = time_queries(matrix.scores, queries, args.queries)
+        if args.skip_legacy:
+            print(f"{size:>10} {'-':>12} {new_ms:>12.2f} {'-':>9}")
+        else:
+            legacy_ms = time_queries(lambda q: legacy_scores(raw, q), queries, max(1, args.queries // 4))
+            print(f"{size:>10} {legacy_ms:>12.2f} {new_ms:>12.2f} {legacy_ms / new_ms:>8.1f}x")
+        del raw, matrix
+
+
+if __name__ == "__main__":
+    main()
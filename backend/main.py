@@ -1,3 +1,5 @@
+import os
+
 from buddy.agents import AnalyzerAgent
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends
 from contextlib import asynccontextmanager
@@ -9,18 +11,30 @@ from auth.router import router as auth_router
 from project.router import router as project_router
 from agent.router import router as agents_router
 from rag.routes import router as rag_router
+from rag.nlp import get_nlp
+from rag.doc_processor import shutdown_extraction_pool
 from models.socket_message import SocketMessage
 from managers.socket_manager import SocketManager
+from managers.ingestion_manager import ingestion_manager
 from session_store import SessionStore
 from auth.dependencies import get_current_user
 
 MAX_CONNECTIONS_PER_USER = 5
 
+# Load spaCy at import time so a preloading server (e.g. gunicorn --preload)
+# forks workers that share the model copy-on-write instead of each loading it
+if os.getenv("RAG_NLP_PRELOAD", "").lower() in ("1", "true", "yes"):
+    get_nlp()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await Database.connect_db()
     await socket_manager.start_cleanup_task()
+    ingestion_manager.notifier = socket_manager.send_job_progress
+    await ingestion_manager.start()
     yield
+    await ingestion_manager.stop()
+    shutdown_extraction_pool()
     await Database.close_db()
 
 app = FastAPI(title="Junior Data Scientist Agent API", lifespan=lifespan)
@@ -82,7 +96,13 @@ async def websocket_endpoint(
         try:
             while True:
                 data = await websocket.receive_json()
-                if "message" in data:
+                if "message" in data and data.get("stream"):
+                    await socket_manager.handle_chat_stream(
+                        websocket,
+                        session_id,
+                        data["message"]
+                    )
+                elif "message" in data:
                     await socket_manager.handle_chat_message(
                         websocket, 
                         session_id, 
@@ -0,0 +1,260 @@
+import os
+import uuid
+import time
+import shutil
+import asyncio
+from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from rag.rag_system import RagSystem
+
+INGEST_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", "2"))
+MAX_JOBS_PER_USER = int(os.getenv("RAG_MAX_JOBS_PER_USER", "2"))
+SPOOL_DIR = os.getenv("RAG_UPLOAD_SPOOL", "data/uploads")
+JOB_RETENTION = timedelta(hours=1)
+# Per-batch progress stages reported while a file's chunks are indexed
+STAGES = ("embedding", "analyzing")
+
+
+class IngestionLimitError(RuntimeError):
+    """The user already has the maximum number of unfinished ingestion jobs."""
+
+
+@dataclass
+class IngestionJob:
+    id: str
+    session_id: str
+    user_id: str
+    files: List[Tuple[str, str]]  # (spooled path, original filename)
+    bytes_total: int
+    file_sizes: List[int] = field(default_factory=list)
+    status: str = "queued"  # queued, running, completed, failed
+    files_done: int = 0
+    bytes_done: int = 0
+    chunks_extracted: int = 0
+    chunks_embedded: int = 0
+    chunks_analyzed: int = 0
+    entities_extracted: int = 0
+    # Per file index: extracted chunk count, and chunks done per stage
+    file_chunks: Dict[int, int] = field(default_factory=dict)
+    stage_done: Dict[Tuple[int, str], Tuple[int, int]] = field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[float] = None
+    finished_at: Optional[datetime] = None
+    on_complete: Optional[Callable[["IngestionJob"], Awaitable[None]]] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def record(self, event: Dict) -> None:
+        """Apply a RagSystem.process_paths progress event."""
+        index = event["index"]
+        if event["stage"] == "extracted":
+            self.chunks_extracted += event["chunks"]
+            self.file_chunks[index] = event["chunks"]
+        elif event["stage"] in STAGES:
+            previous, _ = self.stage_done.get((index, event["stage"]), (0, 0))
+            self.stage_done[(index, event["stage"])] = (event["done"], event["total"])
+            if event["stage"] == "embedding":
+                self.chunks_embedded += event["done"] - previous
+            else:
+                self.chunks_analyzed += event["done"] - previous
+        else:
+            self.files_done += 1
+            self.bytes_done += self.file_sizes[index]
+            self.entities_extracted += event["entities"]
+            # Files whose chunks all collapsed into indexed ones have no batches
+            for stage in STAGES:
+                self.stage_done[(index, stage)] = (1, 1)
+
+    def file_progress(self, index: int) -> float:
+        """Fraction of file ``index``'s embedding and analysis batches done."""
+        fractions = []
+        for stage in STAGES:
+            done, total = self.stage_done.get((index, stage), (0, 0))
+            fractions.append(done / total if total else 0.0)
+        return sum(fractions) / len(fractions)
+
+    def eta_seconds(self) -> Optional[float]:
+        # Extrapolated from the embedding and analysis batches done so far,
+        # weighted by each file's chunks; files not extracted yet are
+        # assumed to hold as many chunks per byte as the extracted ones
+        if self.status != "running" or not self.file_chunks:
+            return None
+        done = sum(chunks * self.file_progress(index) for index, chunks in self.file_chunks.items())
+        if not done:
+            return None
+        total = sum(self.file_chunks.values())
+        extracted_bytes = sum(self.file_sizes[index] for index in self.file_chunks)
+        if extracted_bytes:
+            total *= self.bytes_total / extracted_bytes
+        elapsed = time.monotonic() - self.started_at
+        return max(0.0, elapsed * (total - done) / done)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "files": [filename for _, filename in self.files],
+            "files_done": self.files_done,
+            "chunks_extracted": self.chunks_extracted,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_analyzed": self.chunks_analyzed,
+            "entities_extracted": self.entities_extracted,
+            "eta_seconds": self.eta_seconds(),
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class IngestionManager:
+    """Runs uploads as background jobs on a bounded pool of worker tasks.
+
+    ``submit`` spools the uploaded files to disk and queues a job, so the
+    request returns at once with the job id. ``workers`` tasks take jobs
+    off the queue; jobs of the same session run one at a time because they
+    write the same store. A user may have at most ``max_jobs_per_user``
+    queued or running jobs. Progress is pushed through ``notifier``
+    (session id, job dict) as each file is extracted and indexed, and
+    after every embedding request and analysis batch in between.
+    """
+
+    def __init__(
+        self,
+        workers: int = INGEST_WORKERS,
+        max_jobs_per_user: int = MAX_JOBS_PER_USER,
+        spool_dir: str = SPOOL_DIR
+    ):
+        self.workers = workers
+        self.max_jobs_per_user = max_jobs_per_user
+        self.spool_dir = spool_dir
+        self.jobs: Dict[str, IngestionJob] = {}
+        self.notifier: Optional[Callable[[str, Dict], Awaitable[None]]] = None
+        self._rag_systems: Dict[str, RagSystem] = {}
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if not self._tasks:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def active_jobs(self, user_id: str) -> int:
+        return sum(1 for job in self.jobs.values() if job.user_id == user_id and not job.finished)
+
+    def _prune(self) -> None:
+        cutoff = datetime.utcnow() - JOB_RETENTION
+        for job_id in [job.id for job in self.jobs.values() if job.finished and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    async def submit(
+        self,
+        session_id: str,
+        user_id: str,
+        rag_system: RagSystem,
+        uploads: List,
+        on_complete: Optional[Callable[[IngestionJob], Awaitable[None]]] = None
+    ) -> IngestionJob:
+        """Spool ``uploads`` (UploadFile objects) to disk and queue them as a job."""
+        await self.start()
+        self._prune()
+        if self.active_jobs(user_id) >= self.max_jobs_per_user:
+            raise IngestionLimitError(
+                f"At most {self.max_jobs_per_user} ingestion jobs may run at once per user"
+            )
+
+        # Registered before spooling so concurrent submits count against the cap
+        job = IngestionJob(
+            id=uuid.uuid4().hex,
+            session_id=session_id,
+            user_id=user_id,
+            files=[],
+            bytes_total=0,
+            on_complete=on_complete
+        )
+        self.jobs[job.id] = job
+
+        job_dir = os.path.join(self.spool_dir, job.id)
+        loop = asyncio.get_running_loop()
+        try:
+            os.makedirs(job_dir, exist_ok=True)
+            for i, upload in enumerate(uploads):
+                path = os.path.join(job_dir, f"{i}-{os.path.basename(upload.filename)}")
+                with open(path, "wb") as out:
+                    await loop.run_in_executor(None, shutil.copyfileobj, upload.file, out, 1 << 20)
+                job.files.append((path, upload.filename))
+                job.file_sizes.append(os.path.getsize(path))
+                job.bytes_total += job.file_sizes[-1]
+        except Exception:
+            del self.jobs[job.id]
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        self._rag_systems[job.id] = rag_system
+        await self._queue.put(job)
+        return job
+
+    async def _notify(self, job: IngestionJob) -> None:
+        if self.notifier is not None:
+            try:
+                await self.notifier(job.session_id, job.to_dict())
+            except Exception as e:
+                print(f"Failed to send ingestion progress: {str(e)}")
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: IngestionJob) -> None:
+        rag_system = self._rag_systems.pop(job.id)
+        lock = self._session_locks.setdefault(job.session_id, asyncio.Lock())
+        pending: List[asyncio.Task] = []
+
+        def progress(event: Dict) -> None:
+            job.record(event)
+            pending.append(asyncio.create_task(self._notify(job)))
+
+        async with lock:
+            job.status = "running"
+            job.started_at = time.monotonic()
+            await self._notify(job)
+            try:
+                await rag_system.process_paths(job.files, progress)
+                if job.on_complete is not None:
+                    await job.on_complete(job)
+                job.status = "completed"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = datetime.utcnow()
+                shutil.rmtree(os.path.join(self.spool_dir, job.id), ignore_errors=True)
+                await asyncio.gather(*pending)
+                await self._notify(job)
+
+        # Any job still waiting on this lock is unfinished, so the lock is
+        # only dropped once nothing of the session is queued or running
+        if not any(other.session_id == job.session_id and not other.finished for other in self.jobs.values()):
+            self._session_locks.pop(job.session_id, None)
+
+
+ingestion_manager = IngestionManager()
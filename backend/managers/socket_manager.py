@@ -122,9 +122,107 @@ class SocketManager:
         )
         await self.broadcast(session_id, loading_message)
 
+    async def send_job_progress(self, session_id: str, job: Dict):
+        progress_message = SocketMessage(
+            type="progress",
+            content=job,
+            session_id=session_id
+        )
+        await self.broadcast(session_id, progress_message)
+
     async def update_activity(self, session_id: str):
         self.last_activity[session_id] = datetime.utcnow()
 
+    async def _save_exchange(self, session_id: str, message: str, ai_message: ChatMessage):
+        user_message = ChatMessage(
+            role="user",
+            content=message,
+            timestamp=datetime.utcnow()
+        )
+        collection = await Database.get_collection("rag_sessions")
+        await collection.update_one(
+            {
+                "_id": ObjectId(session_id)
+            }, 
+            {
+                "$push": {"messages": {"$each": [user_message.model_dump(), ai_message.model_dump()]}},
+                "$set": {"updated_at": datetime.utcnow()}
+            }
+        )
+
+    async def handle_chat_stream(self, websocket: WebSocket, session_id: str, message: str):
+        """Stream the answer: a sources frame, delta frames, then the final message.
+
+        The blocking OpenAI stream is consumed on a worker thread and its
+        events are handed to the loop, so every delta is broadcast as soon
+        as it arrives. The exchange is persisted once, after the last delta.
+        """
+        await self.update_activity(session_id)
+        try:
+            rag_system = self.rag_systems.get(session_id)
+            if not rag_system:
+                raise ValueError("RAG system not found for this session")
+
+            await self.send_loading_status(session_id, True)
+
+            loop = asyncio.get_running_loop()
+            events: asyncio.Queue = asyncio.Queue()
+
+            def produce():
+                try:
+                    for event in rag_system.chat_stream(message):
+                        loop.call_soon_threadsafe(events.put_nowait, event)
+                except Exception as e:
+                    loop.call_soon_threadsafe(events.put_nowait, e)
+                finally:
+                    loop.call_soon_threadsafe(events.put_nowait, None)
+
+            producer = loop.run_in_executor(None, produce)
+            done = None
+            while (event := await events.get()) is not None:
+                if isinstance(event, Exception):
+                    raise event
+                if event["type"] == "sources":
+                    await self.broadcast(session_id, SocketMessage(
+                        type="sources",
+                        content=[Source(**src).model_dump() for src in event["sources"]],
+                        session_id=session_id
+                    ))
+                elif event["type"] == "delta":
+                    await self.broadcast(session_id, SocketMessage(
+                        type="delta",
+                        content=event["content"],
+                        session_id=session_id
+                    ))
+                else:
+                    done = event
+            await producer
+
+            ai_message = ChatMessage(
+                role="ai",
+                content=done["answer"],
+                source=[Source(title=src["title"], similarity=src["similarity"]) 
+                    for src in done["sources"]],
+                timestamp=datetime.utcnow()
+            )
+            await self._save_exchange(session_id, message, ai_message)
+
+            await self.broadcast(session_id, SocketMessage(
+                type="message",
+                content=ai_message.model_dump(),
+                session_id=session_id
+            ))
+            await self.send_loading_status(session_id, False)
+
+        except Exception as e:
+            await self.send_loading_status(session_id, False)
+            error_message = SocketMessage(
+                type="error",
+                content=str(e),
+                session_id=session_id
+            )
+            await self.send_message(websocket, error_message)
+
     async def handle_chat_message(self, websocket: WebSocket, session_id: str, message: str):
         await self.update_activity(session_id)
         try:
@@ -134,7 +232,7 @@ class SocketManager:
             
             await self.send_loading_status(session_id, True)
             
-            response = rag_system.chat(message)
+            response = await rag_system.achat(message)
             ai_message = ChatMessage(
                 role="ai",
                 content=response["answer"],
@@ -142,23 +240,9 @@ class SocketManager:
                     for src in response["sources"]],
                 timestamp=datetime.utcnow()
             )
-            user_message = ChatMessage(
-                role="user",
-                content=message,
-                timestamp=datetime.utcnow()
-            )
             
             # updating Db with user and AI messages
-            collection = await Database.get_collection("rag_sessions")
-            await collection.update_one(
-                {
-                    "_id": ObjectId(session_id)
-                }, 
-                {
-                    "$push": {"messages": {"$each": [user_message.model_dump(), ai_message.model_dump()]}},
-                    "$set": {"updated_at": datetime.utcnow()}
-                }
-            )
+            await self._save_exchange(session_id, message, ai_message)
             
             response_message = SocketMessage(
                 type="message",
@@ -3,7 +3,7 @@ from typing import Optional, Any, Literal
 from datetime import datetime
 
 class SocketMessage(BaseModel):
-    type: Literal["message", "error", "info", "initialize", "loading"]
+    type: Literal["message", "error", "info", "initialize", "loading", "progress", "sources", "delta"]
     content: Any
     timestamp: datetime = datetime.utcnow()
     session_id: Optional[str] = None
\ No newline at end of file
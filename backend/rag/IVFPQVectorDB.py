@@ -1,19 +1,45 @@
 import os
 import pickle
 import json
+import threading
 import faiss 
 import numpy as np
 from openai import OpenAI
 from rich.console import Console
 from sklearn.preprocessing import normalize
 
+from rag.embedding_cache import get_embedding_cache
+from rag.query_cache import get_query_cache, normalize_query
+from rag.embedding_client import AsyncEmbeddingClient
+from rag.ivfpq import RawVectorStore, DriftTracker, sample_ids, train_index, quantization_error
+
+
 class IVFPQVectorDB:
-    def __init__(self, api_key=None, console=None, d=1536, db_path=None):
-        """Initialize the vector database"""
+    def __init__(
+        self,
+        api_key=None,
+        console=None,
+        d=1536,
+        db_path=None,
+        cache=None,
+        raw_dtype="float16",
+        max_training=50000,
+        error_drift=1.25,
+        imbalance_drift=1.5,
+        background_retrain=True
+    ):
+        """Initialize the vector database
+
+        ``error_drift`` and ``imbalance_drift`` are the ratios, against the
+        values at the last training, past which ``add`` triggers a retrain.
+        """
         self.client = OpenAI(api_key=api_key)
+        self.embedding_model = "text-embedding-3-small"
+        self.embedding_client = AsyncEmbeddingClient(api_key, self.embedding_model)
+        self.cache = cache if cache is not None else get_embedding_cache()
         self.index = None
         self.metadata = []
-        self.query_cache = {}
+        self.query_cache = get_query_cache()
         self.db_path = db_path if db_path else "data/advance_vector_db.pkl"
         self.console = console if console else Console()
         self.dimension = d
@@ -24,160 +50,131 @@ class IVFPQVectorDB:
         self.M = None  # Number of sub-quantizers
         self.bits_per_subvector = None
         self.nlist = None  # Number of clusters
-        self.raw_index = None  # Store original vectors
-
-    def _calculate_nlist(self, n_vectors):
-        """Calculate appropriate number of clusters based on dataset size"""
-        if n_vectors < 1000:
-            nlist = max(1, int(np.sqrt(n_vectors)))
-        else:
-            nlist = min(4096, max(1, n_vectors // 50))
-        return max(1, min(nlist, n_vectors // 4))
+        self.raw_dtype = raw_dtype
+        self.raw_vectors = RawVectorStore(raw_dtype)  # Normalized vectors for exact reranking
 
-    def _recalculate_pca_params(self, n_vectors):
-        """Recalculate PCA and index parameters based on data size"""
-        # Adjust PCA dimension if needed
-        if n_vectors < self.target_reduction:
-            self.pca_dimension = max(4, (n_vectors // 4) * 4)
-            self.console.print(
-                f"Adjusted PCA dimension to {self.pca_dimension} for {n_vectors} vectors",
-                style="bold yellow"
-            )
-
-        # Calculate M (number of sub-quantizers)
-        possible_m = [v for v in [4, 8, 16] if self.pca_dimension % v == 0]
-        if not possible_m:
-            # Adjust PCA dimension to be compatible with M values
-            old_dim = self.pca_dimension
-            self.pca_dimension = ((self.pca_dimension // 4) * 4)
-            self.console.print(f"Adjusted PCA dimension from {old_dim} to {self.pca_dimension}")
-            possible_m = [v for v in [4, 8, 16] if self.pca_dimension % v == 0]
-            
-        self.M = possible_m[0]
-        
-        # Calculate bits per subvector
-        self.bits_per_subvector = min(8, max(4, self.pca_dimension // (self.M * 4)))
-        
-        # Calculate nlist (number of clusters)
-        self.nlist = self._calculate_nlist(n_vectors)
+        self.max_training = max_training  # Training sample size, drawn uniformly
+        self.error_drift = error_drift
+        self.imbalance_drift = imbalance_drift
+        self.background_retrain = background_retrain
+        self._drift = DriftTracker()
+        self._retraining = False
+        self._lock = threading.RLock()  # Guards the (pca_matrix, index) pair
+        self.tuned_params = None  # Written by benchmarks.ivfpq_tune
 
-    def _create_index(self, n_vectors):
-        """Create FAISS index with current parameters"""
-        if any(v is None for v in [self.M, self.bits_per_subvector, self.nlist]):
-            self._recalculate_pca_params(n_vectors)
+    def _train_index(self, sample, n_vectors):
+        """Train a new PCA + IVF-PQ pair for ``n_vectors`` on normalized ``sample``, off to the side"""
+        return train_index(sample, n_vectors, self.tuned_params)
 
-        # Initialize PCA
-        self.pca_matrix = faiss.PCAMatrix(self.dimension, self.pca_dimension, 0, False)
-        
-        # Create quantizer and index
-        quantizer = faiss.IndexFlatIP(self.pca_dimension)
-        self.index = faiss.IndexIVFPQ(
-            quantizer,
-            self.pca_dimension,
-            self.nlist,
-            self.M,
-            self.bits_per_subvector
-        )
-        self.index.make_direct_map()
-        
-        # Create raw index for original vectors
-        self.raw_index = faiss.IndexFlatIP(self.dimension)
-        
+    def _install(self, pca_matrix, index, params, baseline_error):
+        """Swap in a trained index; callers hold ``self._lock``"""
+        self.pca_matrix, self.index = pca_matrix, index
+        self.pca_dimension, self.M, self.bits_per_subvector, self.nlist = params
+        self._drift.reset(baseline_error)
         self.console.print(
             f"Created index with: PCA={self.pca_dimension}, nlist={self.nlist}, "
             f"M={self.M}, bits={self.bits_per_subvector}",
             style="bold blue"
         )
 
+    def drift(self):
+        """Quantization error and list imbalance, relative to the last training"""
+        with self._lock:
+            return self._drift.ratios(self.index)
+
+    def add(self, vectors, metadata):
+        """Append ``vectors`` and their ``metadata`` using the trained index as is.
+
+        The first call trains the index. Later calls only assign and encode
+        the new vectors; if that pushes quantization error or list imbalance
+        past the drift thresholds, a retrain starts in the background.
+        """
+        vectors = normalize(np.asarray(vectors, dtype=np.float32), axis=1, norm='l2')
+        if len(vectors) == 0:
+            raise ValueError("Empty vector array provided")
+        if len(vectors) != len(metadata):
+            raise ValueError("Vectors and metadata must have the same length")
+
+        with self._lock:
+            if self.index is None:
+                self._install(*self._train_index(vectors[sample_ids(len(vectors), self.max_training)], len(vectors)))
+
+            self.index.add(self.pca_matrix.apply(vectors))
+            self.raw_vectors.add(vectors)
+            self.metadata.extend(metadata)
+
+            self._drift.observe(self.index, quantization_error(self.pca_matrix, self.index, vectors))
+
+        drift = self.drift()
+        if drift["error"] > self.error_drift or drift["imbalance"] > self.imbalance_drift:
+            self.retrain(background=self.background_retrain)
+
+    def retrain(self, background=True):
+        """Retrain PCA and IVF-PQ on a sample of every stored vector and swap it in"""
+        with self._lock:
+            if self._retraining or len(self.raw_vectors) == 0:
+                return
+            self._retraining = True
+
+        if background:
+            threading.Thread(target=self._retrain, daemon=True).start()
+        else:
+            self._retrain()
+
+    def _retrain(self, batch_size=10000):
+        try:
+            n_vectors = len(self.raw_vectors)
+            trained = self._train_index(self.raw_vectors.gather(sample_ids(n_vectors, self.max_training)), n_vectors)
+            pca_matrix, index = trained[0], trained[1]
+            for start in range(0, n_vectors, batch_size):
+                ids = np.arange(start, min(start + batch_size, n_vectors))
+                index.add(pca_matrix.apply(self.raw_vectors.gather(ids)))
+
+            with self._lock:
+                # Catch up on vectors added while the new index was training
+                caught_up = len(self.raw_vectors)
+                if caught_up > n_vectors:
+                    index.add(pca_matrix.apply(self.raw_vectors.gather(np.arange(n_vectors, caught_up))))
+                self._install(*trained)
+        except Exception as e:
+            self.console.print(f"Index retrain failed: {e}", style="bold red")
+        finally:
+            self._retraining = False
+
     def _get_embedding(self, text):
         """Get embedding for a single text"""
         res = self.client.embeddings.create(
             input=text,
-            model="text-embedding-3-small"
+            model=self.embedding_model
         )
         return res.data[0].embedding
 
-    def _get_batch_embeddings(self, texts, batch_size=128):
-        """Get embeddings for a batch of texts"""
-        all_embeddings = []
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            res = self.client.embeddings.create(
-                input=batch,
-                model="text-embedding-3-small"
+    def _get_batch_embeddings(self, texts, batch_size=None):
+        """Get embeddings for a batch of texts, consulting the shared cache first"""
+        all_embeddings = self.cache.get_embeddings(self.embedding_model, texts)
+        missing = [i for i, embedding in enumerate(all_embeddings) if embedding is None]
+        if missing:
+            new_embeddings = self.embedding_client.embed_sync(
+                [texts[idx] for idx in missing],
+                batch_size=batch_size,
+                on_batch=lambda batch, vectors: self.cache.put_embeddings(self.embedding_model, batch, vectors)
             )
-            batch_embeddings = [item.embedding for item in res.data]
-            all_embeddings.extend(batch_embeddings)
+            for idx, embedding in zip(missing, new_embeddings):
+                all_embeddings[idx] = embedding
         return all_embeddings
 
-    def _process_vectors(self, vectors, batch_size=10000):
-        """Process vectors through PCA reduction"""
-        if vectors.shape[0] == 0:
-            raise ValueError("Empty vector array provided")
-            
-        vectors = normalize(vectors, axis=1, norm='l2')
-        
-        if self.pca_matrix is None:
-            self._create_index(vectors.shape[0])
-        
-        if not self.pca_matrix.is_trained:
-            n_vectors = vectors.shape[0]
-            training_vectors = vectors[:min(n_vectors, batch_size)]
-            
-            try:
-                self.pca_matrix.train(training_vectors)
-            except RuntimeError as e:
-                self.console.print(f"PCA training failed: {e}", style="bold red")
-                self._recalculate_pca_params(n_vectors)
-                self._create_index(n_vectors)
-                self.pca_matrix.train(training_vectors)
-        
-        reduced_vectors = []
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i:i + batch_size]
-            reduced_batch = self.pca_matrix.apply_py(batch)
-            reduced_vectors.append(reduced_batch)
-        
-        return np.vstack(reduced_vectors)
-
     def load_data(self, data):
-        """Load and process data into the index"""
+        """Embed ``data`` and add it to the index, training it on first use"""
         with self.console.status("Loading data...") as status:
-            if self.index is not None and len(self.metadata) > 0:
-                self.console.print("Data already loaded.")
-                return
-            
-            # if os.path.exists(self.db_path):
-            #     self.load_db()
-            #     return
-            
-            # Load data
-            # with open(data_file, 'r') as file:
-            #     data = json.load(file)
-            
             texts = [f"{item['content'].lower()}" for item in data]
                     
-            batch_size = 128
-            all_embeddings = []
-            for i in range(0, len(texts), batch_size):
-                batch_texts = texts[i:i + batch_size]
-                batch_embeddings = self._get_batch_embeddings(batch_texts)
-                all_embeddings.extend(batch_embeddings)
+            # One call, so the embedding client can run batches concurrently
+            all_embeddings = self._get_batch_embeddings(texts)
             
             embeddings_array = np.array(all_embeddings).astype('float32')
             
-            status.update("Processing vectors...")
-            processed_embeddings = self._process_vectors(embeddings_array)
-            
-            status.update("Training index...")
-            if not self.index.is_trained:
-                self.index.train(processed_embeddings)
-            
             status.update("Adding vectors to index...")
-            self.index.add(processed_embeddings)
-            self.raw_index.add(embeddings_array)
-            
-            self.metadata = data
+            self.add(embeddings_array, list(data))
             self.save_db()
         
         self.console.print("Data loaded successfully.", style="bold green")
@@ -187,85 +184,121 @@ class IVFPQVectorDB:
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
         faiss_path = self.db_path.replace('.pkl', '.faiss')
-        raw_faiss_path = self.db_path.replace('.pkl', '_raw.faiss')
+        raw_path = self.db_path.replace('.pkl', '_raw.npy')
+        raw_scale_path = self.db_path.replace('.pkl', '_raw_scale.npy')
         pca_path = self.db_path.replace('.pkl', '_pca.faiss')
         
-        faiss.write_index(self.index, faiss_path)
-        faiss.write_index(self.raw_index, raw_faiss_path)
-        faiss.write_VectorTransform(self.pca_matrix, pca_path)
-        
-        data = {
-            "metadata": self.metadata,
-            "query_cache": self.query_cache
-        }
+        with self._lock:
+            faiss.write_index(self.index, faiss_path)
+            self.raw_vectors.save(raw_path, raw_scale_path)
+            faiss.write_VectorTransform(self.pca_matrix, pca_path)
+            # Serve reranking from the memory-mapped copy from here on
+            self.raw_vectors = RawVectorStore.load(raw_path, raw_scale_path)
+            
+            data = {
+                "metadata": self.metadata,
+                "tuned_params": self.tuned_params,
+                "drift_baseline": self._drift.state()
+            }
         
         with open(self.db_path, "wb") as file:
             pickle.dump(data, file)
 
+    @staticmethod
+    def write_tuned_params(db_path, params):
+        """Record tuned index/search parameters in a saved database's metadata"""
+        with open(db_path, 'rb') as file:
+            data = pickle.load(file)
+        data["tuned_params"] = params
+
+        tmp_path = f"{db_path}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(data, file)
+        os.replace(tmp_path, db_path)
+
     def load_db(self):
         """Load the database from disk"""
         if not os.path.exists(self.db_path):
             raise FileNotFoundError("Database file not found")
             
         faiss_path = self.db_path.replace('.pkl', '.faiss')
+        raw_path = self.db_path.replace('.pkl', '_raw.npy')
+        raw_scale_path = self.db_path.replace('.pkl', '_raw_scale.npy')
         raw_faiss_path = self.db_path.replace('.pkl', '_raw.faiss')
         pca_path = self.db_path.replace('.pkl', '_pca.faiss')
         
-        if not (os.path.exists(faiss_path) and os.path.exists(raw_faiss_path) and os.path.exists(pca_path)):
+        has_raw = os.path.exists(raw_path) or os.path.exists(raw_faiss_path)
+        if not (os.path.exists(faiss_path) and has_raw and os.path.exists(pca_path)):
             raise FileNotFoundError("One or more FAISS files are missing")
 
         self.index = faiss.read_index(faiss_path)
-        self.raw_index = faiss.read_index(raw_faiss_path)
         self.pca_matrix = faiss.read_VectorTransform(pca_path)
+        if os.path.exists(raw_path):
+            self.raw_vectors = RawVectorStore.load(raw_path, raw_scale_path)
+        else:
+            # Databases saved before the side store kept a float32 IndexFlatIP
+            raw_index = faiss.read_index(raw_faiss_path)
+            self.raw_vectors = RawVectorStore(self.raw_dtype)
+            self.raw_vectors.add(raw_index.reconstruct_n(0, raw_index.ntotal))
         
         with open(self.db_path, 'rb') as file:
             data = pickle.load(file)
             self.metadata = data.get('metadata', [])
-            self.query_cache = data.get('query_cache', {})
+            self.tuned_params = data.get('tuned_params')
+            baseline = data.get('drift_baseline', {})
+            self._drift = DriftTracker(baseline.get('error'), baseline.get('imbalance'), baseline.get('recent_error'))
+            
+    def search_ids(self, query_embedding, k=3, similarity_threshold=0.5, nprobe=None, pre_k=None):
+        """Ids and exact similarities of the top ``k`` rows for one query embedding"""
+        tuned = self.tuned_params or {}
+        nprobe = nprobe or tuned.get("nprobe", 32)
+        pre_k = pre_k or tuned.get("pre_k", 10)
+
+        query_embedding = normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1), axis=1, norm="l2")
+        # A retrain swaps pca_matrix and index together under the lock
+        with self._lock:
+            processed_query = self.pca_matrix.apply(query_embedding)
             
-    def search(self, query, k=3, similarity_threshold=0.5, nprobe=32, pre_k=10):
+            if isinstance(self.index, faiss.IndexIVFPQ):
+                self.index.nprobe = nprobe
+            similarity, indices = self.index.search(processed_query, pre_k)
+        
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        candidates = indices[0]
+        valid_candidates = candidates[(candidates != -1) & (candidates < len(self.metadata))]
+        if len(valid_candidates) == 0:
+            return empty
+
+        # One gather of the candidate rows, then one gemv
+        candidate_vectors = self.raw_vectors.gather(valid_candidates)
+        exact_similarities = candidate_vectors @ query_embedding[0]
+
+        keep = exact_similarities >= similarity_threshold
+        valid_candidates = valid_candidates[keep]
+        exact_similarities = exact_similarities[keep]
+        if len(valid_candidates) == 0:
+            return empty
+
+        top = min(k, len(valid_candidates))
+        best = np.argpartition(-exact_similarities, top - 1)[:top]
+        best = best[np.argsort(-exact_similarities[best])]
+        return valid_candidates[best], exact_similarities[best]
+
+    def search(self, query, k=3, similarity_threshold=0.5, nprobe=None, pre_k=None):
+        """Top ``k`` chunks for ``query``; nprobe and pre_k default to the tuned values"""
         with self.console.status("Searching...") as cn:
             if self.index is None:
                 self.console.print("Index not loaded.", style="bold red")
                 return
             
-            if query in self.query_cache:
-                query_embedding = self.query_cache[query]
-            else:
+            query = normalize_query(query)
+            query_embedding = self.query_cache.get_many(self.embedding_model, [query])[0]
+            if query_embedding is None:
                 query_embedding = self._get_embedding(query)
-                self.query_cache[query] = query_embedding
-            
-            query_embedding = np.array([query_embedding]).astype('float32')
-            query_embedding = normalize(query_embedding, axis=1, norm="l2")
-            processed_query = self.pca_matrix.apply(query_embedding)
-            
-            if isinstance(self.index, faiss.IndexIVFPQ):
-                self.index.nprobe = nprobe
-            similarity, indices = self.index.search(processed_query, pre_k)
+                self.query_cache.put_many(self.embedding_model, [query], [query_embedding])
             
-            if indices.size > 0:
-                candidates = indices[0]
-                valid_candidates = candidates[candidates != -1]
-
-                if len(valid_candidates) > 0:
-                    candidate_vectors = np.empty((len(valid_candidates), self.dimension), dtype=np.float32)
-                    for i, c in enumerate(valid_candidates):
-                        candidate_vectors[i] = self.raw_index.reconstruct(int(c))
-                    
-                    exact_similarities = np.dot(query_embedding, candidate_vectors.T)[0]
-                    
-                    reranked_indices = valid_candidates[np.argsort(-exact_similarities)]
-                    reranked_similarities = np.sort(exact_similarities)[::-1]
-                    
-                    top_examples = []
-                    for similarity_score, index in zip(reranked_similarities, reranked_indices):
-                        if similarity_score >= similarity_threshold and index < len(self.metadata):
-                            example = {
-                                "metadata": self.metadata[int(index)],
-                                "similarity": float(similarity_score)
-                            }
-                            top_examples.append(example)
-                            if len(top_examples) >= k:
-                                break
-                    return top_examples
-            return []
+            ids, similarities = self.search_ids(query_embedding, k, similarity_threshold, nprobe, pre_k)
+            return [{
+                "metadata": self.metadata[int(idx)],
+                "similarity": float(similarity)
+            } for idx, similarity in zip(ids, similarities)]
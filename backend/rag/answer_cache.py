@@ -0,0 +1,78 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import numpy as np
+
+DEFAULT_ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))
+DEFAULT_ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "256"))
+
+
+class AnswerCache:
+    """Answers of one RAG session, looked up by query embedding similarity.
+
+    An answer is stored under the embedding of the standalone (rewritten)
+    question and a ``scope``: the index version and settings it was
+    produced with. A lookup hits when an entry of the same scope has cosine
+    similarity of at least ``threshold`` with the query; the best such entry
+    is returned. Entries are evicted least recently used beyond
+    ``max_entries``, and ``invalidate`` drops them all (new uploads,
+    settings changes).
+    """
+
+    def __init__(self, threshold: float = DEFAULT_ANSWER_CACHE_THRESHOLD, max_entries: int = DEFAULT_ANSWER_CACHE_SIZE):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, embedding, scope: Hashable) -> Optional[Dict[str, Any]]:
+        query = self._unit(embedding)
+        with self._lock:
+            ids = [entry_id for entry_id, entry in self._entries.items() if entry["scope"] == scope]
+            if ids:
+                similarities = np.stack([self._entries[entry_id]["vector"] for entry_id in ids]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self.hits += 1
+                    self._entries.move_to_end(ids[best])
+                    answer = self._entries[ids[best]]["answer"]
+                    return {**answer, "sources": list(answer["sources"])}
+            self.misses += 1
+            return None
+
+    def put(self, embedding, scope: Hashable, answer: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[self._next_id] = {"vector": self._unit(embedding), "scope": scope, "answer": answer}
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "threshold": self.threshold,
+            }
@@ -0,0 +1,139 @@
+from typing import Dict, List, Any
+
+import numpy as np
+from scipy import sparse
+
+
+class SparseBM25:
+    """Vectorized BM25Okapi over a sparse term-document matrix.
+
+    Scores match ``rank_bm25.BM25Okapi`` (same idf floor, k1, b and epsilon)
+    but are computed as a sparse column sum instead of a Python loop over
+    every document. Term frequencies are kept as flat doc-major CSR arrays so
+    new documents can be appended; idf and length-normalized weights are
+    recompiled lazily on the next query.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        self.vocab: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.tf = np.zeros(0, dtype=np.int32)
+        self.doc_len = np.zeros(0, dtype=np.int32)
+        self.df = np.zeros(0, dtype=np.int64)
+
+        self.idf = None
+        self._weights = None
+
+    @property
+    def corpus_size(self) -> int:
+        return len(self.doc_len)
+
+    def add(self, tokenized_docs: List[List[str]]) -> None:
+        indptr, indices, tf, doc_len = [], [], [], []
+        nnz = int(self.indptr[-1])
+
+        for tokens in tokenized_docs:
+            frequencies = {}
+            for word in tokens:
+                term_id = self.vocab.get(word)
+                if term_id is None:
+                    term_id = len(self.terms)
+                    self.vocab[word] = term_id
+                    self.terms.append(word)
+                frequencies[term_id] = frequencies.get(term_id, 0) + 1
+
+            indices.extend(frequencies.keys())
+            tf.extend(frequencies.values())
+            nnz += len(frequencies)
+            indptr.append(nnz)
+            doc_len.append(len(tokens))
+
+        new_indices = np.array(indices, dtype=np.int32)
+        self.indptr = np.concatenate([self.indptr, np.array(indptr, dtype=np.int64)])
+        self.indices = np.concatenate([self.indices, new_indices])
+        self.tf = np.concatenate([self.tf, np.array(tf, dtype=np.int32)])
+        self.doc_len = np.concatenate([self.doc_len, np.array(doc_len, dtype=np.int32)])
+
+        df = np.zeros(len(self.terms), dtype=np.int64)
+        df[:len(self.df)] = self.df
+        df += np.bincount(new_indices, minlength=len(self.terms))
+        self.df = df
+
+        self.idf = None
+        self._weights = None
+
+    def _compile(self) -> None:
+        n_docs = self.corpus_size
+        idf = np.log(n_docs - self.df + 0.5) - np.log(self.df + 0.5)
+        # rank_bm25 floors negative idf at epsilon * mean idf
+        average_idf = idf.mean() if len(idf) else 0.0
+        idf[idf < 0] = self.epsilon * average_idf
+        self.idf = idf
+
+        avgdl = self.doc_len.sum() / n_docs
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / avgdl)
+        rows = np.repeat(np.arange(n_docs), np.diff(self.indptr))
+        tf = self.tf.astype(np.float64)
+        data = tf * (self.k1 + 1) / (tf + norm[rows])
+
+        # Term-major layout so a query only touches the columns of its terms
+        self._weights = sparse.csr_matrix(
+            (data, self.indices, self.indptr),
+            shape=(n_docs, len(self.terms))
+        ).tocsc()
+
+    def get_scores_many(self, queries: List[List[str]]) -> np.ndarray:
+        """BM25 scores with shape (len(queries), corpus_size)."""
+        if self.corpus_size == 0:
+            return np.zeros((len(queries), 0))
+        if self._weights is None:
+            self._compile()
+
+        rows, cols = [], []
+        for query_idx, tokens in enumerate(queries):
+            for word in tokens:
+                term_id = self.vocab.get(word)
+                if term_id is not None:
+                    rows.append(term_id)
+                    cols.append(query_idx)
+
+        # Repeated query terms count once per occurrence, as in rank_bm25
+        rows = np.array(rows, dtype=np.int64)
+        query_terms = sparse.csc_matrix(
+            (self.idf[rows], (rows, np.array(cols, dtype=np.int64))),
+            shape=(len(self.terms), len(queries))
+        )
+        return np.asarray((self._weights @ query_terms).todense()).T
+
+    def get_scores(self, query: List[str]) -> np.ndarray:
+        return self.get_scores_many([query])[0]
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "epsilon": self.epsilon,
+            "terms": self.terms,
+            "indptr": self.indptr,
+            "indices": self.indices,
+            "tf": self.tf,
+            "doc_len": self.doc_len,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SparseBM25":
+        bm25 = cls(state["k1"], state["b"], state["epsilon"])
+        bm25.terms = list(state["terms"])
+        bm25.vocab = {term: idx for idx, term in enumerate(bm25.terms)}
+        bm25.indptr = np.asarray(state["indptr"], dtype=np.int64)
+        bm25.indices = np.asarray(state["indices"], dtype=np.int32)
+        bm25.tf = np.asarray(state["tf"], dtype=np.int32)
+        bm25.doc_len = np.asarray(state["doc_len"], dtype=np.int32)
+        bm25.df = np.bincount(bm25.indices, minlength=len(bm25.terms)).astype(np.int64)
+        return bm25
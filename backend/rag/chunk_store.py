@@ -0,0 +1,188 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag.index_store import ColumnList
+
+# One int32 row per chunk. ``start``/``end`` are character offsets into the
+# source document's text, ``ordinal`` is the 1-based chunk number within
+# that document (0 when unknown) and pages are 0 when the source has none.
+COLUMNS = ("doc", "start", "end", "tokens", "ordinal", "page_start", "page_end")
+# Extra sources of an indexed chunk: the chunk id, then a COLUMNS row
+REF_COLUMNS = ("chunk",) + COLUMNS
+Span = Tuple[int, int, int, int, int, int]
+
+
+class ChunkStore:
+    """Chunk text kept once per source document, chunks as offset rows.
+
+    Each uploaded document's text is stored a single time; a chunk is a row
+    of the int32 table (see COLUMNS) pointing into it. Chunk content,
+    lowercased views and metadata dicts are built on access, so overlapping
+    windows and per-chunk dicts cost no text of their own.
+
+    Near-duplicate chunks are indexed once; each further occurrence is a
+    reference row naming the chunk it collapsed into, and shows up in that
+    chunk's ``sources``.
+
+    Loaded rows (possibly memory-mapped) are kept as they are; rows added
+    since are folded in on the next access, as in KnowledgeGraph. Folding
+    happens under the store's own lock, since readers trigger it too.
+    """
+
+    def __init__(
+        self,
+        titles: Optional[List[str]] = None,
+        texts: Optional[ColumnList] = None,
+        rows: Optional[np.ndarray] = None,
+        refs: Optional[np.ndarray] = None
+    ):
+        self.titles: List[str] = list(titles or [])
+        self.texts = texts if texts is not None else ColumnList()
+        self._base_rows = rows if rows is not None else np.zeros((0, len(COLUMNS)), dtype=np.int32)
+        self._pending: List[Tuple[int, ...]] = []
+        self._rows: Optional[np.ndarray] = None
+        self._base_refs = refs if refs is not None else np.zeros((0, len(REF_COLUMNS)), dtype=np.int32)
+        self._pending_refs: List[Tuple[int, ...]] = []
+        self._refs_by_chunk: Optional[Dict[int, List[int]]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._base_rows) + len(self._pending)
+
+    @property
+    def rows(self) -> np.ndarray:
+        with self._lock:
+            if self._rows is None:
+                if self._pending:
+                    pending = np.array(self._pending, dtype=np.int32).reshape(-1, len(COLUMNS))
+                    self._base_rows = np.concatenate([self._base_rows, pending])
+                    self._pending = []
+                self._rows = self._base_rows
+            return self._rows
+
+    @property
+    def refs(self) -> np.ndarray:
+        with self._lock:
+            if self._pending_refs:
+                pending = np.array(self._pending_refs, dtype=np.int32).reshape(-1, len(REF_COLUMNS))
+                self._base_refs = np.concatenate([self._base_refs, pending])
+                self._pending_refs = []
+            return self._base_refs
+
+    def add_document(self, title: str, text: str) -> int:
+        doc_id = len(self.titles)
+        self.titles.append(title)
+        self.texts.extend([text])
+        return doc_id
+
+    def add_spans(self, doc_id: int, spans: Iterable[Span]) -> None:
+        """Add chunks of ``doc_id`` as (start, end, tokens, ordinal, page_start, page_end)."""
+        with self._lock:
+            self._pending.extend((doc_id, *span) for span in spans)
+            self._rows = None
+
+    def add_rows(self, rows: np.ndarray) -> None:
+        with self._lock:
+            self._pending.extend(map(tuple, np.asarray(rows, dtype=np.int32).tolist()))
+            self._rows = None
+
+    def add_reference(self, chunk: int, doc_id: int, span: Span) -> None:
+        """Record ``span`` of ``doc_id`` as another source of indexed ``chunk``."""
+        with self._lock:
+            self._pending_refs.append((chunk, doc_id, *span))
+            self._refs_by_chunk = None
+
+    def add_ref_rows(self, refs: np.ndarray) -> None:
+        with self._lock:
+            self._pending_refs.extend(map(tuple, np.asarray(refs, dtype=np.int32).tolist()))
+            self._refs_by_chunk = None
+
+    def references(self, idx: int) -> np.ndarray:
+        """COLUMNS rows of the extra sources of chunk ``idx``."""
+        with self._lock:
+            if self._refs_by_chunk is None:
+                self._refs_by_chunk = {}
+                for position, chunk in enumerate(self.refs[:, 0].tolist()):
+                    self._refs_by_chunk.setdefault(chunk, []).append(position)
+            return self.refs[self._refs_by_chunk.get(int(idx), []), 1:]
+
+    def add_items(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Add chunk dicts (title, content, pages), each as its own source text.
+
+        Used for callers of ``add_documents`` and for stores written before
+        chunks were spans; titles of the form ``"<file> - Chunk <n>"`` keep
+        their file name and chunk number.
+        """
+        for item in items:
+            title, ordinal = item.get("title", ""), 0
+            prefix, sep, number = title.rpartition(" - Chunk ")
+            if sep and number.isdigit():
+                title, ordinal = prefix, int(number)
+            content = item["content"]
+            doc_id = self.add_document(title, content)
+            self.add_spans(doc_id, [(
+                0, len(content), 0, ordinal,
+                item.get("page_start") or 0, item.get("page_end") or 0
+            )])
+
+    def text(self, idx: int) -> str:
+        doc, start, end = self.rows[int(idx), :3]
+        return self.texts[int(doc)][start:end]
+
+    def _source(self, row) -> Dict[str, Any]:
+        doc, _, _, _, ordinal, page_start, page_end = (int(v) for v in row)
+        title = self.titles[doc]
+        source = {"title": f"{title} - Chunk {ordinal}" if ordinal else title}
+        if page_start:
+            source["page_start"] = page_start
+            source["page_end"] = page_end
+        return source
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        """The chunk's metadata dict, as returned from search.
+
+        Chunks that near-duplicates collapsed into also list every place
+        they occur under ``sources``, their own first.
+        """
+        row = self.rows[int(idx)]
+        doc, start, end = (int(v) for v in row[:3])
+        item = self._source(row)
+        item["content"] = self.texts[doc][start:end]
+        references = self.references(idx)
+        if len(references):
+            item["sources"] = [self._source(row)] + [self._source(ref) for ref in references]
+        return item
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def state(self) -> Dict[str, Any]:
+        return {"titles": self.titles, "texts": list(self.texts), "rows": self.rows, "refs": self.refs}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "ChunkStore":
+        texts = state["texts"]
+        if not isinstance(texts, ColumnList):
+            column = ColumnList()
+            column.extend(texts)
+            texts = column
+        # Stores written before near-duplicate collapsing have no references
+        return cls(list(state["titles"]), texts, state["rows"], state.get("refs"))
+
+    def positions(self) -> Tuple[int, int, int]:
+        """(documents, chunks, references) counts, for ``tail``."""
+        with self._lock:
+            return len(self.titles), len(self), len(self._base_refs) + len(self._pending_refs)
+
+    def tail(self, first_doc: int, first_chunk: int, first_ref: int) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+        """Documents, rows and references added since ``positions``, doc ids rebased to 0."""
+        rows = self.rows[first_chunk:].copy()
+        rows[:, 0] -= first_doc
+        refs = self.refs[first_ref:].copy()
+        refs[:, 1] -= first_doc
+        texts: Sequence[str] = [self.texts[idx] for idx in range(first_doc, len(self.titles))]
+        return self.titles[first_doc:], list(texts), rows, refs
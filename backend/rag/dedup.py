@@ -0,0 +1,164 @@
+import os
+import zlib
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+DEFAULT_DEDUP_THRESHOLD = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.85"))
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(text: str, size: int = 5) -> Set[int]:
+    """crc32 hashes of the word ``size``-grams of ``text``."""
+    words = text.split()
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode())}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode()) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index over the indexed chunks, for collapsing near-duplicates.
+
+    Every chunk gets a ``num_perm`` MinHash signature over its word
+    shingles, cut into ``bands`` bands; chunks that share any band key are
+    candidates. Candidates are confirmed by the exact shingle Jaccard
+    against ``threshold``, so the banding only has to be loose enough not to
+    miss pairs above it. Only the band keys (``bands`` uint64 per chunk)
+    are kept and persisted; buckets are rebuilt from them on first use.
+
+    Ids are positions in SimilarityMatching.chunks. A ``threshold`` above 1
+    disables matching.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_DEDUP_THRESHOLD,
+        num_perm: int = 128,
+        bands: int = 16,
+        band_keys: Optional[np.ndarray] = None
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        # Fixed seed: persisted band keys must stay comparable across runs
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, int(_MERSENNE), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE), num_perm, dtype=np.uint64)
+        self._mix = rng.integers(1, 1 << 63, num_perm // bands, dtype=np.uint64)
+
+        self._base_keys = band_keys if band_keys is not None else np.zeros((0, bands), dtype=np.uint64)
+        self._pending: List[np.ndarray] = []
+        self._buckets: Optional[List[Dict[int, List[int]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._base_keys) + len(self._pending)
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold <= 1
+
+    @property
+    def keys(self) -> np.ndarray:
+        if self._pending:
+            self._base_keys = np.concatenate([self._base_keys, np.array(self._pending, dtype=np.uint64)])
+            self._pending = []
+        return self._base_keys
+
+    def band_keys(self, hashes: Set[int]) -> np.ndarray:
+        x = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        # Universal hashing (a * x + b) mod p, wrapping in uint64 as
+        # datasketch does; only agreement between signatures matters
+        with np.errstate(over="ignore"):
+            signature = ((np.outer(x, self._a) + self._b) % _MERSENNE & _MAX_HASH).min(axis=0)
+            return (signature.reshape(self.bands, -1) * self._mix).sum(axis=1)
+
+    def _bucketed(self) -> List[Dict[int, List[int]]]:
+        if self._buckets is None:
+            self._buckets = [{} for _ in range(self.bands)]
+            for idx, row in enumerate(self.keys.tolist()):
+                self._bucket(self._buckets, row, idx)
+        return self._buckets
+
+    @staticmethod
+    def _bucket(buckets, row: List[int], idx: int) -> None:
+        for band, key in enumerate(row):
+            buckets[band].setdefault(key, []).append(idx)
+
+    @staticmethod
+    def _candidates(buckets, row: List[int]) -> List[int]:
+        found = set()
+        for band, key in enumerate(row):
+            found.update(buckets[band].get(key, ()))
+        return sorted(found)
+
+    def match(
+        self,
+        texts: List[str],
+        text_of: Callable[[int], str]
+    ) -> Tuple[List[int], List[int], np.ndarray]:
+        """Resolve ``texts`` against the index and against each other.
+
+        Returns (targets, fresh, keys): ``targets[i]`` is the id text ``i``
+        collapses into, ``fresh`` the positions of the texts that are new
+        (their ids follow len(self) in order) and ``keys`` their band keys
+        for ``add``. Nothing is recorded until ``add`` is called.
+        """
+        base = len(self)
+        targets: List[int] = []
+        fresh: List[int] = []
+        fresh_keys: List[np.ndarray] = []
+        if not self.enabled:
+            keys = [self.band_keys(shingles(text)) for text in texts]
+            return list(range(base, base + len(texts))), list(range(len(texts))), np.array(keys, dtype=np.uint64)
+
+        buckets = self._bucketed()
+        local: List[Dict[int, List[int]]] = [{} for _ in range(self.bands)]
+        local_shingles: Dict[int, Set[int]] = {}
+        for i, text in enumerate(texts):
+            hashes = shingles(text)
+            keys = self.band_keys(hashes)
+            row = keys.tolist()
+
+            target = None
+            for idx in self._candidates(local, row):
+                if jaccard(hashes, local_shingles[idx]) >= self.threshold:
+                    target = idx
+                    break
+            if target is None:
+                for idx in self._candidates(buckets, row):
+                    if jaccard(hashes, shingles(text_of(idx))) >= self.threshold:
+                        target = idx
+                        break
+            if target is None:
+                target = base + len(fresh)
+                fresh.append(i)
+                fresh_keys.append(keys)
+                local_shingles[target] = hashes
+                self._bucket(local, row, target)
+            targets.append(target)
+
+        return targets, fresh, np.array(fresh_keys, dtype=np.uint64).reshape(-1, self.bands)
+
+    def add(self, keys: np.ndarray) -> None:
+        """Record band keys for the next ids, in order."""
+        for row in np.asarray(keys, dtype=np.uint64):
+            if self._buckets is not None:
+                self._bucket(self._buckets, row.tolist(), len(self))
+            self._pending.append(row)
+
+    def add_texts(self, texts: List[str]) -> None:
+        self.add(np.array([self.band_keys(shingles(text)) for text in texts], dtype=np.uint64).reshape(-1, self.bands))
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"band_keys": self.keys}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray], threshold: float = DEFAULT_DEDUP_THRESHOLD) -> "NearDuplicateIndex":
+        return cls(threshold, band_keys=state["band_keys"])
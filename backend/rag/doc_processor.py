@@ -1,33 +1,29 @@
-from typing import List, BinaryIO
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, BinaryIO, Optional, Tuple
 import PyPDF2
 import tiktoken
 from io import BytesIO
 
+EXTRACTION_WORKERS = int(os.getenv("RAG_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+
 class DocumentProcessor:
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.tokenizer = tiktoken.get_encoding("cl100k_base")
     
-    def split_text(self, text: str) -> List[str]:
-        """Spliting text into chunks based on token count"""
-        chunks = []
-        tokens = self.tokenizer.encode(text)
-        for i in range(0, len(tokens), self.chunk_size - self.chunk_overlap):
-            chunk = tokens[i:i+self.chunk_size]
-            chunks.append(self.tokenizer.decode(chunk))
-        return chunks
-    
-    def read_pdf(self, file: BinaryIO) -> str:
+    def iter_pdf_pages(self, file: BinaryIO) -> Iterator[Tuple[int, str]]:
+        """Yield (1-based page number, text) one page at a time"""
         try:
             pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            for number, page in enumerate(pdf_reader.pages, start=1):
+                yield number, page.extract_text() + "\n"
         except Exception as e:
             raise ValueError(f"Error reading PDF file: {str(e)}")
-    
+
     def read_text(self, file: BinaryIO) -> str:
         try:
             if isinstance(file.read(), bytes):
@@ -38,27 +34,112 @@ class DocumentProcessor:
         except UnicodeDecodeError:
             raise ValueError("Could not decode text file with UTF-8 encoding")
 
-    def process_files(self, file: BinaryIO):
+    def iter_token_spans(self, pages: Iterator[Tuple[int, str]], text_parts: List[str]) -> Iterator[Tuple[int, ...]]:
+        """Yield overlapping token windows as character spans as pages stream in.
+
+        Windows are ``chunk_size`` tokens, starting every ``chunk_size -
+        chunk_overlap`` tokens. Each page's text is appended to
+        ``text_parts``; spans are (start, end, token count, chunk number,
+        first page, last page) with offsets into ``"".join(text_parts)``, so
+        chunks need no text of their own (see ChunkStore).
+        """
+        step = self.chunk_size - self.chunk_overlap
+        starts: List[int] = []
+        token_pages: List[int] = []
+        length = 0
+        ordinal = 0
+
+        def span(end: int) -> Tuple[int, ...]:
+            nonlocal ordinal
+            ordinal += 1
+            char_end = starts[end] if end < len(starts) else length
+            return starts[0], char_end, end, ordinal, token_pages[0], token_pages[end - 1]
+
+        for number, text in pages:
+            page_tokens = self.tokenizer.encode(text)
+            text, offsets = self.tokenizer.decode_with_offsets(page_tokens)
+            starts.extend(length + offset for offset in offsets)
+            token_pages.extend([number] * len(page_tokens))
+            text_parts.append(text)
+            length += len(text)
+            while len(starts) >= self.chunk_size:
+                yield span(self.chunk_size)
+                del starts[:step]
+                del token_pages[:step]
+
+        while starts:
+            yield span(min(self.chunk_size, len(starts)))
+            del starts[:step]
+            del token_pages[:step]
+
+    def _iter_pages(self, file: BinaryIO, name: str) -> Iterator[Tuple[int, str]]:
+        if name.endswith('.pdf'):
+            return self.iter_pdf_pages(file)
+        if name.endswith('.txt'):
+            return iter([(1, self.read_text(file))])
+        raise ValueError("File format not supported")
+
+    def extract_document(self, file: BinaryIO, name: Optional[str] = None) -> Dict[str, Any]:
+        """``file``'s text once plus its chunk spans, for SimilarityMatching.add_document
+
+        ``name`` (default ``file.name``) is the title and picks the format.
+        """
+        name = name or getattr(file, 'name', None)
+        if not name:
+            raise ValueError("File object must have a name attribute")
+
         try:
-            if not hasattr(file, 'name'):
-                raise ValueError("File object must have a name attribute")
-
-            if file.name.endswith('.pdf'):
-                text = self.read_pdf(file)
-            elif file.name.endswith('.txt'):
-                text = self.read_text(file)
-            else:
-                raise ValueError("File format not supported")
-            
-            chunks = self.split_text(text)
-            doc_chunks = []
-            
-            for i, chunk in enumerate(chunks):
-                doc_chunks.append({
-                    "title": f"{file.name} - Chunk {i+1}",
-                    "content": chunk,
-                })
-            print("Processed file:", len(doc_chunks))
-            return doc_chunks
+            text_parts: List[str] = []
+            spans = list(self.iter_token_spans(self._iter_pages(file, name), text_parts))
+            return {"title": name, "text": "".join(text_parts), "chunks": spans}
         except Exception as e:
-            raise ValueError(f"Error processing file {file.name}: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error processing file {name}: {str(e)}")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_processors: Dict[Tuple[int, int], DocumentProcessor] = {}
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Process-wide pool (RAG_EXTRACTION_WORKERS, default one per core) for file extraction"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers import only this module, not the server's threads or models
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_extraction_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _extract(file: BinaryIO, filename: str, chunk_size: int, chunk_overlap: int) -> Dict[str, Any]:
+    key = (chunk_size, chunk_overlap)
+    if key not in _processors:
+        _processors[key] = DocumentProcessor(chunk_size, chunk_overlap)
+    document = _processors[key].extract_document(file, filename)
+    print("Processed file:", len(document["chunks"]))
+    return document
+
+
+def extract_document(content: bytes, filename: str, chunk_size: int, chunk_overlap: int) -> Dict[str, Any]:
+    """Parse and chunk one uploaded file; module-level so the pool can pickle it"""
+    return _extract(BytesIO(content), filename, chunk_size, chunk_overlap)
+
+
+def extract_file(path: str, filename: str, chunk_size: int, chunk_overlap: int) -> Dict[str, Any]:
+    """``extract_document`` for an upload spooled to ``path``.
+
+    The worker parses straight from the open file, so PyPDF2 reads pages on
+    demand instead of from an in-memory copy of the upload.
+    """
+    with open(path, "rb") as file:
+        return _extract(file, filename, chunk_size, chunk_overlap)
@@ -0,0 +1,148 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.getenv("RAG_EMBEDDING_CACHE", "data/cache/embeddings.sqlite")
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed, cross-session cache for chunk embeddings and NLP output.
+
+    Embeddings are keyed by (embedding model, sha256 of the text) and NLP
+    analyses (entities, sentence entities, tokens) by (nlp model, sha256), so
+    the same chunk uploaded to any session, by any user, is embedded and
+    parsed only once for as long as the cache file is kept.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or DEFAULT_CACHE_PATH
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, digest TEXT NOT NULL, dim INTEGER NOT NULL, "
+            "vector BLOB NOT NULL, PRIMARY KEY (model, digest))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "model TEXT NOT NULL, digest TEXT NOT NULL, payload TEXT NOT NULL, "
+            "PRIMARY KEY (model, digest))"
+        )
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+        }
+
+    def _fetch(self, table: str, columns: str, model: str, digests: List[str]) -> Dict[str, tuple]:
+        found = {}
+        unique = list(dict.fromkeys(digests))
+        with self._lock:
+            for i in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[i:i + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT digest, {columns} FROM {table} "
+                    f"WHERE model = ? AND digest IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for row in rows:
+                    found[row[0]] = row[1:]
+        return found
+
+    def get_embeddings(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        digests = [content_hash(text) for text in texts]
+        found = self._fetch("embeddings", "dim, vector", model, digests)
+
+        results = []
+        for digest in digests:
+            row = found.get(digest)
+            if row is None:
+                self.misses += 1
+                results.append(None)
+                continue
+            dim, blob = row
+            self.hits += 1
+            self.bytes_read += len(blob)
+            results.append(np.frombuffer(blob, dtype=np.float32, count=dim))
+        return results
+
+    def put_embeddings(self, model: str, texts: List[str], vectors) -> None:
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            self.bytes_written += len(blob)
+            rows.append((model, content_hash(text), len(blob) // 4, blob))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, digest, dim, vector) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def get_analyses(self, model: str, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        digests = [content_hash(text) for text in texts]
+        found = self._fetch("analyses", "payload", model, digests)
+
+        results = []
+        for digest in digests:
+            row = found.get(digest)
+            if row is None:
+                self.misses += 1
+                results.append(None)
+                continue
+            self.hits += 1
+            self.bytes_read += len(row[0])
+            results.append(json.loads(row[0]))
+        return results
+
+    def put_analyses(self, model: str, texts: List[str], analyses: List[Dict[str, Any]]) -> None:
+        rows = []
+        for text, analysis in zip(texts, analyses):
+            payload = json.dumps(analysis)
+            self.bytes_written += len(payload)
+            rows.append((model, content_hash(text), payload))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO analyses (model, digest, payload) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(path: Optional[str] = None) -> EmbeddingCache:
+    """Process-wide cache instance for ``path`` (default: RAG_EMBEDDING_CACHE)."""
+    path = path or DEFAULT_CACHE_PATH
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = EmbeddingCache(path)
+        return _caches[path]
@@ -0,0 +1,316 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import openai
+from openai import AsyncOpenAI
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("RAG_EMBEDDING_CONCURRENCY", "8"))
+DEFAULT_RPM = int(os.getenv("RAG_EMBEDDING_RPM", "3000"))
+DEFAULT_TPM = int(os.getenv("RAG_EMBEDDING_TPM", "1000000"))
+DEFAULT_BASE_URL = os.getenv("RAG_EMBEDDING_BASE_URL") or None
+DEFAULT_BATCH_TOKENS = int(os.getenv("RAG_EMBEDDING_BATCH_TOKENS", "100000"))
+# The embeddings endpoint accepts at most this many inputs per request
+MAX_BATCH_INPUTS = 2048
+
+_RETRYABLE = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Continuously refilling bucket of ``capacity`` units per minute.
+
+    The balance is kept under a thread lock and waiting is a plain sleep, so
+    one bucket can be shared by every event loop and thread in the process.
+    Callers reserve their units up front (the balance may go negative) and
+    sleep until the refill covers them, so waiters are served in order.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _reserve(self, amount: float) -> float:
+        # A request larger than the bucket waits for a full bucket instead
+        # of waiting forever
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self, amount: float) -> None:
+        delay = self._reserve(amount)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ConcurrencyLimit:
+    """Counting semaphore shared by every event loop and thread in the process.
+
+    A released slot is handed straight to the oldest waiter, on that
+    waiter's own loop.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            loop = asyncio.get_running_loop()
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                if (loop, waiter) in self._waiters:
+                    self._waiters.remove((loop, waiter))
+                    raise
+            # The slot was handed over as the wait was cancelled
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def _wake(self, waiter: asyncio.Future) -> None:
+        if waiter.cancelled():
+            self.release()
+        else:
+            waiter.set_result(None)
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(self._wake, waiter)
+                    return
+            self.active -= 1
+
+    async def __aenter__(self) -> "ConcurrencyLimit":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+
+RateLimits = Tuple[ConcurrencyLimit, TokenBucket, TokenBucket]
+_rate_limits: Dict[Tuple[str, str], RateLimits] = {}
+_rate_limits_lock = threading.Lock()
+
+
+def get_rate_limits(
+    api_key: str,
+    model: str,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    requests_per_minute: int = DEFAULT_RPM,
+    tokens_per_minute: int = DEFAULT_TPM
+) -> RateLimits:
+    """Process-wide (concurrency, requests, tokens) limits for one API key and model.
+
+    The provider enforces its limits per key and model, so every client and
+    call using the pair draws from the same budget; the first caller's
+    limits are the ones kept.
+    """
+    key = (api_key, model)
+    with _rate_limits_lock:
+        if key not in _rate_limits:
+            _rate_limits[key] = (
+                ConcurrencyLimit(max_concurrency),
+                TokenBucket(requests_per_minute),
+                TokenBucket(tokens_per_minute),
+            )
+        return _rate_limits[key]
+
+
+def _token_counter(tokenizer=None) -> Callable[[str], int]:
+    try:
+        if tokenizer is None:
+            import tiktoken
+            # The encoding of the text-embedding-3 models
+            tokenizer = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(tokenizer.encode(text, disallowed_special=()))
+    except Exception:
+        # No encoding available offline; ~4 characters per token for English
+        return lambda text: max(1, len(text) // 4)
+
+
+class EmbeddingBatchError(RuntimeError):
+    """Some batches failed after all retries; the rest completed."""
+
+    def __init__(self, message: str, embeddings: List[Optional[List[float]]]):
+        super().__init__(message)
+        self.embeddings = embeddings
+
+
+class AsyncEmbeddingClient:
+    """Concurrent embeddings with request and token rate limits and retries.
+
+    Batches run up to ``max_concurrency`` at a time. Each one first takes
+    one request from the requests-per-minute bucket and its estimated token
+    count from the tokens-per-minute bucket. These limits are shared by
+    every client and call with the same API key and model (see
+    get_rate_limits), however many sessions and event loops embed at once. Rate-limit, connection,
+    timeout and 5xx errors are retried with full-jitter exponential backoff,
+    honouring ``Retry-After`` when the server sends it.
+
+    Inputs are deduplicated, then packed greedily into requests of at most
+    ``max_batch_tokens`` tokens (and MAX_BATCH_INPUTS texts), so long chunks
+    don't overflow a request and short ones don't waste round trips.
+
+    ``on_batch`` is called with each batch's texts and vectors as soon as it
+    completes, so callers can persist progress; a failed ingest then resumes
+    from the batches that already succeeded (see EmbeddingCache). Point
+    ``base_url`` at any OpenAI-compatible server, e.g. a local fake in tests.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "text-embedding-3-small",
+        base_url: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        requests_per_minute: int = DEFAULT_RPM,
+        tokens_per_minute: int = DEFAULT_TPM,
+        max_batch_tokens: int = DEFAULT_BATCH_TOKENS,
+        tokenizer=None,
+        max_retries: int = 6,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url or DEFAULT_BASE_URL
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_batch_tokens = max_batch_tokens
+        self.tokenizer = tokenizer
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._token_counter = None
+
+    def _count_tokens(self, text: str) -> int:
+        # Resolved on first use: tiktoken may fetch its encoding over the network
+        if self._token_counter is None:
+            self._token_counter = _token_counter(self.tokenizer)
+        return self._token_counter(text)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(self.max_delay, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _pack(self, texts: List[str], max_inputs: int) -> List[Tuple[List[str], int]]:
+        """Greedy consecutive batches of (texts, token count) under both ceilings."""
+        batches, batch, batch_tokens = [], [], 0
+        for text in texts:
+            tokens = self._count_tokens(text)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= max_inputs):
+                batches.append((batch, batch_tokens))
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append((batch, batch_tokens))
+        return batches
+
+    async def _embed_batch(self, client, limits, batch: List[str], cost: int) -> List[List[float]]:
+        concurrency, requests, tokens = limits
+        async with concurrency:
+            for attempt in range(self.max_retries + 1):
+                await requests.acquire(1)
+                await tokens.acquire(cost)
+                try:
+                    res = await client.embeddings.create(input=batch, model=self.model)
+                    return [item.embedding for item in res.data]
+                except _RETRYABLE as e:
+                    if attempt == self.max_retries:
+                        raise
+                    await asyncio.sleep(self._backoff(attempt, e))
+
+    async def embed(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        on_batch: Optional[Callable[[List[str], List[List[float]]], None]] = None
+    ) -> List[List[float]]:
+        """Embeddings for ``texts`` in order; raises EmbeddingBatchError on partial failure.
+
+        ``batch_size`` optionally lowers the per-request input cap below
+        MAX_BATCH_INPUTS; requests are otherwise cut by token count.
+        """
+        # The HTTP client is bound to the running event loop; the rate
+        # limits are not
+        client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        limits = get_rate_limits(
+            self.api_key,
+            self.model,
+            self.max_concurrency,
+            self.requests_per_minute,
+            self.tokens_per_minute
+        )
+        max_inputs = min(batch_size or MAX_BATCH_INPUTS, MAX_BATCH_INPUTS)
+        batches = self._pack(list(dict.fromkeys(texts)), max_inputs)
+        embedded: Dict[str, List[float]] = {}
+
+        async def run(batch: List[str], cost: int) -> None:
+            embeddings = await self._embed_batch(client, limits, batch, cost)
+            embedded.update(zip(batch, embeddings))
+            if on_batch is not None:
+                on_batch(batch, embeddings)
+
+        try:
+            outcomes = await asyncio.gather(*(run(*batch) for batch in batches), return_exceptions=True)
+        finally:
+            await client.close()
+
+        results = [embedded.get(text) for text in texts]
+        errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        if errors:
+            raise EmbeddingBatchError(
+                f"{len(errors)} of {len(batches)} embedding batches failed: {errors[0]}",
+                results
+            )
+        return results
+
+    def embed_sync(self, texts: List[str], batch_size: Optional[int] = None, on_batch=None) -> List[List[float]]:
+        """``embed`` for synchronous callers, including ones inside a running loop."""
+        coro = self.embed(texts, batch_size, on_batch)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        # Called from async code (e.g. a FastAPI handler): use a private loop
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
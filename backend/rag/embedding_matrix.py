@@ -0,0 +1,109 @@
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+class EmbeddingMatrix:
+    """Growable, unit-normalized, C-contiguous float32 embedding store.
+
+    Rows are normalized once when they are appended, so cosine similarity
+    against a normalized query is a single matrix-vector product over the
+    backing buffer. Capacity grows geometrically to keep appends amortized
+    O(new rows).
+    """
+
+    def __init__(self, dimension: Optional[int] = None, capacity: int = 0):
+        self.dimension = dimension
+        self._size = 0
+        self._data = None
+        if dimension is not None:
+            self._data = np.empty((capacity, dimension), dtype=np.float32, order="C")
+        self._local = threading.local()
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    @classmethod
+    def from_array(cls, vectors: np.ndarray) -> "EmbeddingMatrix":
+        vectors = np.asarray(vectors)
+        matrix = cls()
+        if vectors.size:
+            matrix.append(vectors)
+        return matrix
+
+    @classmethod
+    def from_normalized(cls, vectors: np.ndarray) -> "EmbeddingMatrix":
+        """Wrap rows that are already unit-normalized float32, without copying.
+
+        ``vectors`` may be a read-only memory map; the first append moves the
+        rows into a growable in-memory buffer.
+        """
+        matrix = cls()
+        if len(vectors):
+            matrix.dimension = vectors.shape[1]
+            matrix._data = vectors
+            matrix._size = len(vectors)
+        return matrix
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._data is None:
+            return np.empty((0, self.dimension or 0), dtype=np.float32)
+        return self._data[:self._size]
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= self._data.shape[0]:
+            return
+        new_capacity = max(capacity, 2 * self._data.shape[0], 1024)
+        data = np.empty((new_capacity, self.dimension), dtype=np.float32, order="C")
+        data[:self._size] = self._data[:self._size]
+        self._data = data
+
+    def append(self, vectors: np.ndarray) -> None:
+        vectors = self.normalize(vectors)
+        if self._data is None:
+            self.dimension = vectors.shape[1]
+            self._data = np.empty((0, self.dimension), dtype=np.float32, order="C")
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Embedding dimension mismatch: expected {self.dimension}, got {vectors.shape[1]}"
+            )
+
+        self._reserve(self._size + len(vectors))
+        self._data[self._size:self._size + len(vectors)] = vectors
+        self._size += len(vectors)
+
+    def _score_buffer(self) -> np.ndarray:
+        # One reusable output buffer per thread, so concurrent searches never
+        # share it and a query allocates nothing proportional to the corpus.
+        buffer = getattr(self._local, "scores", None)
+        if buffer is None or buffer.shape[0] < self._size:
+            buffer = np.empty(max(self._size, 1024), dtype=np.float32)
+            self._local.scores = buffer
+        return buffer[:self._size]
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every row against ``query``.
+
+        The returned array is a per-thread buffer that is overwritten by the
+        next call on the same thread; copy it if it has to outlive that.
+        """
+        query = self.normalize(query).ravel()
+        out = self._score_buffer()
+        np.dot(self.matrix, query, out=out)
+        return out
+
+    def scores_many(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity matrix of shape (len(queries), len(self))."""
+        queries = self.normalize(queries)
+        return np.dot(queries, self.matrix.T)
@@ -0,0 +1,163 @@
+import os
+import json
+import shutil
+from typing import Callable, Dict, List, Optional, Any
+
+import numpy as np
+import pyarrow as pa
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+
+class ColumnList:
+    """List-like view over an Arrow column, plus rows appended in memory.
+
+    Rows of the column are only converted to Python objects (and, with
+    ``decode``, parsed) when they are indexed, so a memory-mapped column is
+    paged in lazily instead of being materialized at load.
+    """
+
+    def __init__(self, column: Optional[pa.ChunkedArray] = None, decode: Optional[Callable] = None):
+        self._column = column
+        self._decode = decode
+        self._tail: List[Any] = []
+
+    @property
+    def _base(self) -> int:
+        return len(self._column) if self._column is not None else 0
+
+    def __len__(self) -> int:
+        return self._base + len(self._tail)
+
+    def __getitem__(self, idx: int) -> Any:
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("ColumnList index out of range")
+        if idx >= self._base:
+            return self._tail[idx - self._base]
+        value = self._column[idx].as_py()
+        return self._decode(value) if self._decode else value
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def extend(self, values) -> None:
+        self._tail.extend(values)
+
+
+class IndexStore:
+    """Directory of columnar segments backing one SimilarityMatching store.
+
+    ``manifest.json`` names the current snapshot segment and the delta
+    segments written after it. Arrays are stored as ``.npy`` and opened with
+    ``mmap_mode="r"``; string and JSON columns are uncompressed Arrow IPC
+    files opened through a memory map, so loading reads neither in full.
+
+    Every segment is written to a temporary directory and renamed into place
+    before the manifest is atomically replaced to reference it, so readers
+    only ever see complete segments.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def read_manifest(self) -> Dict[str, Any]:
+        if not self.exists():
+            return {"version": FORMAT_VERSION, "next_segment": 1, "snapshot": None, "deltas": []}
+        with open(self.manifest_path, "r") as file:
+            return json.load(file)
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(manifest, file)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _write_segment(
+        self,
+        manifest: Dict[str, Any],
+        arrays: Dict[str, np.ndarray],
+        columns: Dict[str, Dict[str, List[Any]]],
+        meta: Dict[str, Any]
+    ) -> str:
+        name = f"seg-{manifest['next_segment']:06d}"
+        manifest["next_segment"] += 1
+
+        final_dir = os.path.join(self.path, name)
+        tmp_dir = f"{final_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        for key, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{key}.npy"), np.ascontiguousarray(array))
+        for key, table in columns.items():
+            table = pa.table(table)
+            with pa.OSFile(os.path.join(tmp_dir, f"{key}.arrow"), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as file:
+            json.dump(meta, file)
+
+        os.replace(tmp_dir, final_dir)
+        return name
+
+    def read_segment(self, name: str) -> Dict[str, Any]:
+        """Memory-mapped arrays, Arrow tables and metadata of one segment."""
+        segment_dir = os.path.join(self.path, name)
+        arrays, tables = {}, {}
+        for filename in os.listdir(segment_dir):
+            key, ext = os.path.splitext(filename)
+            path = os.path.join(segment_dir, filename)
+            if ext == ".npy":
+                arrays[key] = np.load(path, mmap_mode="r")
+            elif ext == ".arrow":
+                tables[key] = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        with open(os.path.join(segment_dir, "meta.json"), "r") as file:
+            meta = json.load(file)
+        return {"arrays": arrays, "tables": tables, "meta": meta}
+
+    def append_delta(
+        self,
+        arrays: Dict[str, np.ndarray],
+        columns: Dict[str, Dict[str, List[Any]]],
+        meta: Optional[Dict[str, Any]] = None
+    ) -> str:
+        os.makedirs(self.path, exist_ok=True)
+        manifest = self.read_manifest()
+        name = self._write_segment(manifest, arrays, columns, meta or {})
+        manifest["deltas"].append(name)
+        self._write_manifest(manifest)
+        return name
+
+    def write_snapshot(
+        self,
+        arrays: Dict[str, np.ndarray],
+        columns: Dict[str, Dict[str, List[Any]]],
+        meta: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Write a full snapshot that supersedes every existing segment."""
+        os.makedirs(self.path, exist_ok=True)
+        manifest = self.read_manifest()
+        stale = ([manifest["snapshot"]] if manifest["snapshot"] else []) + manifest["deltas"]
+
+        name = self._write_segment(manifest, arrays, columns, meta or {})
+        manifest["snapshot"] = name
+        manifest["deltas"] = []
+        self._write_manifest(manifest)
+
+        # Old segments may still be memory-mapped by this process; on POSIX
+        # the mapping stays valid after the files are unlinked.
+        for old in stale:
+            shutil.rmtree(os.path.join(self.path, old), ignore_errors=True)
+        return name
@@ -0,0 +1,184 @@
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+from sklearn.preprocessing import normalize
+
+# (pca_dimension, M, bits_per_subvector, nlist)
+IndexParams = Tuple[int, int, int, int]
+
+
+class RawVectorStore:
+    """Compact side store of the indexed vectors, used for exact reranking.
+
+    Rows are unit-normalized and kept as float16, or as int8 with a per-row
+    float32 scale. Saved stores are memory-mapped on load, so a search only
+    pages in its candidate rows instead of keeping every float32 vector
+    resident next to the PQ codes.
+    """
+
+    def __init__(self, dtype="float16"):
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unsupported raw vector dtype: {dtype}")
+        self.dtype = dtype
+        self.codes = None
+        self.scales = None
+
+    def __len__(self):
+        return 0 if self.codes is None else len(self.codes)
+
+    def add(self, vectors):
+        vectors = normalize(np.asarray(vectors, dtype=np.float32), axis=1, norm='l2')
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.round(vectors / scales[:, None]).astype(np.int8)
+            scales = scales.astype(np.float32)
+            self.scales = scales if self.scales is None else np.concatenate([self.scales, scales])
+        else:
+            codes = vectors.astype(np.float16)
+        self.codes = codes if self.codes is None else np.concatenate([self.codes, codes])
+
+    def gather(self, ids):
+        """float32 rows for ``ids``, in one vectorized fancy-index read."""
+        rows = self.codes[ids].astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[ids, None]
+        return rows
+
+    @staticmethod
+    def _save_array(path, array):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            np.save(file, array)
+        os.replace(tmp_path, path)
+
+    def save(self, path, scale_path):
+        self._save_array(path, self.codes)
+        if self.scales is not None:
+            self._save_array(scale_path, self.scales)
+        elif os.path.exists(scale_path):
+            os.remove(scale_path)
+
+    @classmethod
+    def load(cls, path, scale_path):
+        codes = np.load(path, mmap_mode="r")
+        store = cls("int8" if codes.dtype == np.int8 else "float16")
+        store.codes = codes
+        if store.dtype == "int8":
+            store.scales = np.load(scale_path, mmap_mode="r")
+        return store
+
+
+def calculate_nlist(n_vectors: int) -> int:
+    """Calculate appropriate number of clusters based on dataset size"""
+    if n_vectors < 1000:
+        nlist = max(1, int(np.sqrt(n_vectors)))
+    else:
+        nlist = min(4096, max(1, n_vectors // 50))
+    return max(1, min(nlist, n_vectors // 4))
+
+
+def index_params(dimension: int, n_vectors: int, tuned: Optional[Dict[str, Any]] = None) -> IndexParams:
+    """PCA width, sub-quantizers, bits per sub-vector and nlist for ``n_vectors``
+
+    Tuned parameters (see benchmarks.ivfpq_tune) win over the heuristics
+    when present; their nlist is scaled with the corpus from the size it
+    was tuned at.
+    """
+    target_reduction = dimension // 24
+    pca_dimension = tuned["pca_dimension"] if tuned else target_reduction - (target_reduction % 4)
+    if n_vectors < pca_dimension:
+        pca_dimension = max(4, (n_vectors // 4) * 4)
+
+    if tuned and pca_dimension % tuned["M"] == 0:
+        M = tuned["M"]
+        bits_per_subvector = tuned["bits"]
+        nlist = round(tuned["nlist"] * n_vectors / tuned["n_vectors"])
+        nlist = max(1, min(nlist, n_vectors // 4))
+    else:
+        # pca_dimension is a multiple of 4, so M=4 always fits
+        M = [v for v in [4, 8, 16] if pca_dimension % v == 0][0]
+        bits_per_subvector = min(8, max(4, pca_dimension // (M * 4)))
+        nlist = calculate_nlist(n_vectors)
+    return pca_dimension, M, bits_per_subvector, nlist
+
+
+def sample_ids(n_vectors: int, max_training: int) -> np.ndarray:
+    """Uniform training sample, rather than the first rows of the corpus"""
+    if n_vectors <= max_training:
+        return np.arange(n_vectors)
+    return np.sort(np.random.default_rng().choice(n_vectors, max_training, replace=False))
+
+
+def quantization_error(pca_matrix, index, vectors) -> float:
+    """Mean squared error of encoding then decoding ``vectors`` through PCA and PQ"""
+    codes = index.sa_encode(pca_matrix.apply(vectors))
+    restored = pca_matrix.reverse_transform(index.sa_decode(codes))
+    return float(np.mean(np.sum((vectors - restored) ** 2, axis=1)))
+
+
+def train_index(sample: np.ndarray, n_vectors: int, tuned: Optional[Dict[str, Any]] = None):
+    """Train a new, empty PCA + IVF-PQ pair for ``n_vectors`` on normalized ``sample``
+
+    Returns (pca_matrix, index, params, baseline quantization error).
+    """
+    dimension = sample.shape[1]
+    params = index_params(dimension, n_vectors, tuned)
+    pca_dimension, M, bits_per_subvector, nlist = params
+
+    pca_matrix = faiss.PCAMatrix(dimension, pca_dimension, 0, False)
+    pca_matrix.train(sample)
+
+    quantizer = faiss.IndexFlatIP(pca_dimension)
+    index = faiss.IndexIVFPQ(quantizer, pca_dimension, nlist, M, bits_per_subvector)
+    index.train(pca_matrix.apply(sample))
+    index.make_direct_map()
+
+    return pca_matrix, index, params, quantization_error(pca_matrix, index, sample)
+
+
+class DriftTracker:
+    """Quantization error and list imbalance of an index, relative to its training.
+
+    ``observe`` is fed the error of each batch added after training; it is
+    smoothed over recent batches, so one odd upload doesn't retrain.
+    """
+
+    def __init__(self, baseline_error=None, baseline_imbalance=None, recent_error=None):
+        self.baseline_error = baseline_error
+        self.baseline_imbalance = baseline_imbalance
+        self.recent_error = recent_error
+
+    def reset(self, baseline_error: float) -> None:
+        self.baseline_error = baseline_error
+        self.baseline_imbalance = None
+        self.recent_error = None
+
+    def observe(self, index, error: float) -> None:
+        if self.baseline_imbalance is None:
+            self.baseline_imbalance = index.invlists.imbalance_factor()
+        self.recent_error = error if self.recent_error is None else 0.5 * (self.recent_error + error)
+
+    def ratios(self, index) -> Dict[str, float]:
+        if index is None or self.baseline_error is None:
+            return {"error": 1.0, "imbalance": 1.0}
+        error = 1.0
+        if self.recent_error is not None and self.baseline_error > 0:
+            error = self.recent_error / self.baseline_error
+        imbalance = 1.0
+        if self.baseline_imbalance:
+            imbalance = index.invlists.imbalance_factor() / self.baseline_imbalance
+        return {"error": error, "imbalance": imbalance}
+
+    def exceeded(self, index, error_drift: float, imbalance_drift: float) -> bool:
+        ratios = self.ratios(index)
+        return ratios["error"] > error_drift or ratios["imbalance"] > imbalance_drift
+
+    def state(self) -> Dict[str, Optional[float]]:
+        return {
+            "error": self.baseline_error,
+            "imbalance": self.baseline_imbalance,
+            "recent_error": self.recent_error
+        }
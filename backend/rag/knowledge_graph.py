@@ -0,0 +1,188 @@
+from typing import Dict, List, Set, Any, Optional
+
+import numpy as np
+from scipy import sparse
+
+
+class KnowledgeGraph:
+    """Entity co-occurrence graph compiled to sparse matrices for scoring.
+
+    Entities that appear in the same sentence are linked by an unweighted
+    edge, and every entity records the chunks it occurs in. For scoring, the
+    graph is compiled into a symmetric adjacency matrix and an
+    entity-to-chunk incidence matrix. Two-hop expansion around the query
+    entities then takes two sparse products instead of one shortest-path
+    search per (entity, chunk) pair.
+    """
+
+    def __init__(self):
+        self.entities: List[str] = []
+        self.labels: List[str] = []
+        self.entity_ids: Dict[str, int] = {}
+        self.n_docs = 0
+
+        # Loaded (possibly memory-mapped) (2, k) index arrays, plus pairs
+        # added since, which are folded in on the next compile
+        self._base_edges = np.zeros((2, 0), dtype=np.int32)
+        self._base_incidence = np.zeros((2, 0), dtype=np.int32)
+        self._edge_src: List[int] = []
+        self._edge_dst: List[int] = []
+        self._inc_entity: List[int] = []
+        self._inc_doc: List[int] = []
+
+        self._adjacency = None
+        self._incidence = None
+
+    def __contains__(self, entity: str) -> bool:
+        return entity in self.entity_ids
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def _entity_id(self, entity: str, label: str) -> int:
+        entity_id = self.entity_ids.get(entity)
+        if entity_id is None:
+            entity_id = len(self.entities)
+            self.entity_ids[entity] = entity_id
+            self.entities.append(entity)
+            self.labels.append(label)
+        return entity_id
+
+    def add(self, extraction: Dict[str, Any], doc_idx: int) -> Set[str]:
+        """Add one chunk's entities and sentence co-occurrence edges."""
+        entities = set()
+        for entity, label in extraction["entities"]:
+            entities.add(entity)
+            self._inc_entity.append(self._entity_id(entity, label))
+            self._inc_doc.append(doc_idx)
+
+        for sent_entities in extraction["sentences"]:
+            ids = [self.entity_ids[entity] for entity in sent_entities if entity in self.entity_ids]
+            for i in range(len(ids)):
+                for j in range(i + 1, len(ids)):
+                    if ids[i] != ids[j]:
+                        self._edge_src.append(ids[i])
+                        self._edge_dst.append(ids[j])
+
+        self.n_docs = max(self.n_docs, doc_idx + 1)
+        self._adjacency = None
+        self._incidence = None
+        return entities
+
+    def _edges(self) -> np.ndarray:
+        pending = np.array([self._edge_src, self._edge_dst], dtype=np.int32).reshape(2, -1)
+        return np.concatenate([self._base_edges, pending], axis=1)
+
+    def _incidence_pairs(self) -> np.ndarray:
+        pending = np.array([self._inc_entity, self._inc_doc], dtype=np.int32).reshape(2, -1)
+        return np.concatenate([self._base_incidence, pending], axis=1)
+
+    def _compile(self) -> None:
+        n = len(self.entities)
+        src, dst = self._edges().astype(np.int64)
+        adjacency = sparse.csr_matrix(
+            (np.ones(2 * len(src)), (np.concatenate([src, dst]), np.concatenate([dst, src]))),
+            shape=(n, n)
+        )
+        adjacency.data[:] = 1.0
+        self._adjacency = adjacency
+
+        inc_entity, inc_doc = self._incidence_pairs().astype(np.int64)
+        incidence = sparse.csr_matrix(
+            (np.ones(len(inc_entity)), (inc_entity, inc_doc)),
+            shape=(n, self.n_docs)
+        )
+        incidence.data[:] = 1.0
+        self._incidence = incidence
+
+    @staticmethod
+    def _binarize(matrix: sparse.spmatrix) -> sparse.csr_matrix:
+        matrix = sparse.csr_matrix(matrix)
+        matrix.eliminate_zeros()
+        matrix.data[:] = 1.0
+        return matrix
+
+    def scores_many(self, query_entities: List[Set[str]], n_docs: Optional[int] = None) -> np.ndarray:
+        """Raw graph scores with shape (len(query_entities), n_docs).
+
+        Every entity within two hops of a query entity contributes
+        1 / (1 + hops) to each chunk it occurs in, summed over query entities.
+        """
+        n_docs = self.n_docs if n_docs is None else n_docs
+        scores = np.zeros((len(query_entities), n_docs))
+
+        columns, owners = [], []
+        for query_idx, entities in enumerate(query_entities):
+            for entity in entities:
+                entity_id = self.entity_ids.get(entity)
+                if entity_id is not None:
+                    columns.append(entity_id)
+                    owners.append(query_idx)
+        if not columns:
+            return scores
+
+        if self._adjacency is None:
+            self._compile()
+
+        n, m = len(self.entities), len(columns)
+        seeds = sparse.csr_matrix(
+            (np.ones(m), (columns, np.arange(m))),
+            shape=(n, m)
+        )
+        # Hop distances, one column per query entity; each ring reuses the last
+        hop1 = self._binarize(self._adjacency @ seeds)
+        hop1 = self._binarize(hop1 - hop1.multiply(seeds))
+        seen = self._binarize(seeds + hop1)
+        hop2 = self._binarize(self._adjacency @ hop1)
+        hop2 = self._binarize(hop2 - hop2.multiply(seen))
+
+        weights = seeds + hop1 * (1.0 / 2.0) + hop2 * (1.0 / 3.0)
+        owner = sparse.csr_matrix(
+            (np.ones(m), (np.arange(m), owners)),
+            shape=(m, len(query_entities))
+        )
+        doc_scores = (self._incidence.T @ (weights @ owner)).toarray().T
+        width = min(n_docs, doc_scores.shape[1])
+        scores[:, :width] = doc_scores[:, :width]
+        return scores
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "entities": self.entities,
+            "labels": self.labels,
+            "n_docs": self.n_docs,
+            "edges": self._edges(),
+            "incidence": self._incidence_pairs(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "KnowledgeGraph":
+        graph = cls()
+        graph.entities = list(state["entities"])
+        graph.labels = list(state["labels"])
+        graph.entity_ids = {entity: idx for idx, entity in enumerate(graph.entities)}
+        graph.n_docs = int(state["n_docs"])
+        graph._base_edges = np.asarray(state["edges"], dtype=np.int32).reshape(2, -1)
+        graph._base_incidence = np.asarray(state["incidence"], dtype=np.int32).reshape(2, -1)
+        return graph
+
+    @classmethod
+    def from_networkx(cls, node_link_data: Dict[str, Any], entity_doc_map: Dict[str, Set[int]]) -> "KnowledgeGraph":
+        """Convert the node-link graph and entity map of older snapshots."""
+        import networkx as nx
+
+        nx_graph = nx.node_link_graph(node_link_data)
+        graph = cls()
+        for entity, attrs in nx_graph.nodes(data=True):
+            graph._entity_id(entity, attrs.get("label", ""))
+        for src, dst in nx_graph.edges():
+            if src != dst:
+                graph._edge_src.append(graph.entity_ids[src])
+                graph._edge_dst.append(graph.entity_ids[dst])
+        for entity, doc_indices in entity_doc_map.items():
+            entity_id = graph._entity_id(entity, "")
+            for doc_idx in doc_indices:
+                graph._inc_entity.append(entity_id)
+                graph._inc_doc.append(doc_idx)
+                graph.n_docs = max(graph.n_docs, doc_idx + 1)
+        return graph
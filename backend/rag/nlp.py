@@ -0,0 +1,69 @@
+import os
+import threading
+from typing import Callable, Dict, List, Any, Optional
+
+import spacy
+
+DEFAULT_NLP_MODEL = os.getenv("RAG_NLP_MODEL", "en_core_web_lg")
+DEFAULT_N_PROCESS = int(os.getenv("RAG_NLP_PROCESSES", "1"))
+DEFAULT_BATCH_SIZE = int(os.getenv("RAG_NLP_BATCH_SIZE", "64"))
+
+# Only ner (entities) and parser (sentence boundaries) are read; the rest
+# of the en_core_web_* pipeline is skipped on every call.
+_UNUSED_PIPES = ("tagger", "attribute_ruler", "lemmatizer")
+
+_pipelines: Dict[str, spacy.language.Language] = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_nlp(model: Optional[str] = None) -> spacy.language.Language:
+    """Process-wide spaCy pipeline for ``model`` (default: RAG_NLP_MODEL).
+
+    The model is loaded on first use and shared by every session in the
+    worker. Calling this before the server forks (see ``RAG_NLP_PRELOAD`` in
+    main.py) lets workers share the model's pages copy-on-write.
+    """
+    model = model or DEFAULT_NLP_MODEL
+    with _pipelines_lock:
+        if model not in _pipelines:
+            nlp = spacy.load(model)
+            for name in _UNUSED_PIPES:
+                if name in nlp.pipe_names:
+                    nlp.disable_pipe(name)
+            _pipelines[model] = nlp
+        return _pipelines[model]
+
+
+def _analysis(doc, text: str) -> Dict[str, Any]:
+    return {
+        "entities": [(ent.text.lower(), ent.label_) for ent in doc.ents],
+        "sentences": [[ent.text.lower() for ent in sent.ents] for sent in doc.sents],
+        "tokens": text.split()
+    }
+
+
+def analyze_texts(
+    texts: List[str],
+    model: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    n_process: Optional[int] = None,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> List[Dict[str, Any]]:
+    """Entities, per-sentence entities and tokens for each text, via ``nlp.pipe``.
+
+    ``on_batch`` is called with the number of texts analyzed so far after
+    every ``batch_size`` texts and at the end.
+    """
+    nlp = get_nlp(model)
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    n_process = n_process or DEFAULT_N_PROCESS
+    # Worker processes reload the model, so only fan out for larger batches
+    if len(texts) < 2 * batch_size:
+        n_process = 1
+    docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+    analyses = []
+    for doc, text in zip(docs, texts):
+        analyses.append(_analysis(doc, text))
+        if on_batch is not None and (len(analyses) % batch_size == 0 or len(analyses) == len(texts)):
+            on_batch(len(analyses))
+    return analyses
@@ -0,0 +1,129 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag.embedding_cache import EmbeddingCache, get_embedding_cache
+
+DEFAULT_QUERY_CACHE_BYTES = int(os.getenv("RAG_QUERY_CACHE_BYTES", str(64 * 1024 * 1024)))
+DEFAULT_QUERY_CACHE_TTL = float(os.getenv("RAG_QUERY_CACHE_TTL", "86400"))
+QUERY_CACHE_DISK = os.getenv("RAG_QUERY_CACHE_DISK", "").lower() in ("1", "true", "yes")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split())
+
+
+class QueryEmbeddingCache:
+    """Process-wide LRU of query embeddings, shared by every session.
+
+    Vectors are float32 arrays keyed by (embedding model, normalized query
+    text). Entries expire ``ttl`` seconds after they were stored, and the
+    least recently used ones are evicted once the vectors exceed
+    ``max_bytes``. With a ``disk`` tier (the content-addressed
+    EmbeddingCache), memory misses fall through to it and are promoted back,
+    so query embeddings also survive restarts. Nothing here is written to
+    the session index files.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_QUERY_CACHE_BYTES,
+        ttl: float = DEFAULT_QUERY_CACHE_TTL,
+        disk: Optional[EmbeddingCache] = None
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk = disk
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        _, vector = self._entries.pop(key)
+        self.bytes -= vector.nbytes
+
+    def _store(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, vector)
+        self.bytes += vector.nbytes
+        while self.bytes > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get_many(self, model: str, queries: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for ``queries`` (already normalized), None where missing"""
+        results: List[Optional[np.ndarray]] = []
+        now = time.monotonic()
+        with self._lock:
+            for query in queries:
+                key = (model, query)
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] <= now:
+                    self._drop(key)
+                    entry = None
+                if entry is None:
+                    results.append(None)
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                results.append(entry[1])
+
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing and self.disk is not None:
+            found = self.disk.get_embeddings(model, [queries[i] for i in missing])
+            with self._lock:
+                for i, vector in zip(missing, found):
+                    if vector is not None:
+                        self.disk_hits += 1
+                        self._store((model, queries[i]), vector)
+                        results[i] = vector
+        with self._lock:
+            self.misses += sum(vector is None for vector in results)
+        return results
+
+    def put_many(self, model: str, queries: List[str], vectors) -> None:
+        arrays = [np.asarray(vector, dtype=np.float32) for vector in vectors]
+        with self._lock:
+            for query, vector in zip(queries, arrays):
+                self._store((model, query), vector)
+        if self.disk is not None:
+            self.disk.put_embeddings(model, queries, arrays)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_query_cache: Optional[QueryEmbeddingCache] = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryEmbeddingCache:
+    """Process-wide query cache, disk-backed when RAG_QUERY_CACHE_DISK is set."""
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryEmbeddingCache(disk=get_embedding_cache() if QUERY_CACHE_DISK else None)
+        return _query_cache
@@ -1,60 +1,130 @@
 import os 
 import re
+import asyncio
 import json
 import tempfile
 import logging
 from io import BytesIO
-from openai import OpenAI
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from openai import OpenAI, AsyncOpenAI
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
 
 from rag.similarity_matching import SimilarityMatching
-from rag.doc_processor import DocumentProcessor
+from rag.answer_cache import AnswerCache
+from rag.doc_processor import DocumentProcessor, extract_document, extract_file, get_extraction_pool
 from models.rag import SettingsConfig, RagSession
+from buddy.model.cache import get_response_cache
 
-from models.rag import SettingsConfig, RagSession
+LLM_CACHE_PATH = os.getenv("RAG_LLM_CACHE", "data/cache/llm_responses.sqlite")
+SCORING_THREADS = int(os.getenv("RAG_SCORING_THREADS", str(min(4, os.cpu_count() or 1))))
+_scoring_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_scoring_pool() -> ThreadPoolExecutor:
+    """Bounded pool (RAG_SCORING_THREADS) for search scoring off the event loop"""
+    global _scoring_pool
+    if _scoring_pool is None:
+        _scoring_pool = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix="rag-scoring")
+    return _scoring_pool
 
-import logging
-from typing import List, Dict, Optional
-from dataclasses import dataclass
-from enum import Enum
 
 class RagSystem:
     def __init__(self, api_key=None, session_id=None, settings: Optional[SettingsConfig] = None):
         self.client = OpenAI(api_key=api_key)
+        self.async_client = AsyncOpenAI(api_key=api_key)
         self.session_id = session_id
         self.doc_processor = DocumentProcessor(chunk_size=500, chunk_overlap=100)
         self.vector_db = SimilarityMatching(
             api_key=api_key, 
-            db_path=f'data/rag_sessions/{session_id}/vector_db.pkl'
+            db_path=f'data/rag_sessions/{session_id}/vector_db',
+            tokenizer=self.doc_processor.tokenizer
         )
+        # Uploads are appended to the session's saved index, so it has to be
+        # open before the first one; compaction would otherwise replace it
+        if self.vector_db.exists():
+            self.vector_db.load_db()
         self.memory = []
-        self.chunks = []
+        self.answer_cache = AnswerCache()
+        self.response_cache = get_response_cache(LLM_CACHE_PATH)
         self.settings = settings or SettingsConfig()
         self.logger = logging.getLogger(__name__)
     
-    def get_embeddings(self, text: str) -> List[float]:
-        response = self.client.embeddings.create(
-            input=text,
-            model="text-embedding-3-small"
-        )
-        return response.data[0].embedding
-    
-    async def process_files(self, files: List) -> int:
-        chunks = []
+    async def process_files(self, files: List, progress: Optional[Callable[[Dict], None]] = None) -> int:
+        # Files are parsed and chunked in parallel worker processes; results
+        # are consumed in upload order and indexed off the event loop, so
+        # the server keeps handling other requests meanwhile
+        loop = asyncio.get_running_loop()
+        pool = get_extraction_pool()
+        jobs = []
         for file in files:
             content = await file.read()
-            file_obj = BytesIO(content)
-            file_obj.name = file.filename
-            file_chunks = self.doc_processor.process_files(file_obj)
-            chunks.extend(file_chunks)
+            jobs.append((file.filename, loop.run_in_executor(
+                pool,
+                extract_document,
+                content,
+                file.filename,
+                self.doc_processor.chunk_size,
+                self.doc_processor.chunk_overlap
+            )))
             await file.seek(0)
-        self.chunks.extend(chunks)
-        self._load_vector_store()
-        return len(chunks)
+        return await self._index_extracted(jobs, progress)
+
+    async def process_paths(self, files: List[Tuple[str, str]], progress: Optional[Callable[[Dict], None]] = None) -> int:
+        """``process_files`` for uploads spooled to disk, as (path, filename) pairs"""
+        loop = asyncio.get_running_loop()
+        pool = get_extraction_pool()
+        jobs = [(filename, loop.run_in_executor(
+            pool,
+            extract_file,
+            path,
+            filename,
+            self.doc_processor.chunk_size,
+            self.doc_processor.chunk_overlap
+        )) for path, filename in files]
+        return await self._index_extracted(jobs, progress)
+
+    async def _index_extracted(self, jobs: List, progress: Optional[Callable[[Dict], None]]) -> int:
+        # ``progress`` gets an "extracted" and an "indexed" event per file
+        # and, in between, an "embedding" or "analyzing" event (chunks done
+        # of total) after every embedding request and analysis batch; all
+        # on the event loop thread
+        loop = asyncio.get_running_loop()
+        graph = self.vector_db.knowledge_graph
+        total = 0
+        for index, (filename, job) in enumerate(jobs):
+            document = await job
+            on_batch = None
+            if progress:
+                progress({"stage": "extracted", "file": filename, "index": index, "chunks": len(document["chunks"])})
+
+                def on_batch(stage: str, done: int, chunks: int, filename=filename, index=index) -> None:
+                    loop.call_soon_threadsafe(progress, {
+                        "stage": stage,
+                        "file": filename,
+                        "index": index,
+                        "done": done,
+                        "total": chunks
+                    })
+            entities = len(graph)
+            chunks = await loop.run_in_executor(None, self._load_vector_store, document, on_batch)
+            total += chunks
+            if progress:
+                progress({
+                    "stage": "indexed",
+                    "file": filename,
+                    "index": index,
+                    "chunks": chunks,
+                    "entities": len(graph) - entities
+                })
+        return total
     
-    def _load_vector_store(self):
-        self.vector_db.load_data(self.chunks)
-        self.vector_db.save_db()
+    def _load_vector_store(self, document: Dict, progress: Optional[Callable[[str, int, int], None]] = None) -> int:
+        # Only the new chunks are embedded and indexed; add_document
+        # persists them as a delta, so there is no second full save here.
+        chunks = self.vector_db.add_document(document, progress=progress)
+        self.answer_cache.invalidate()
+        return chunks
     
     def _format_context(self, relevant_docs: List[Dict]) -> str:
         context = "\n\nRelevant Information:\n"
@@ -76,68 +146,34 @@ class RagSystem:
         - Provide partial answers when possible, clearly indicating what aspects you can and cannot address
         - Use natural, conversational language while maintaining accuracy"""
 
-    def _update_query(self, question: str) -> str:
-        prompt = """
-        You are an advanced AI assistant specialized in query processing and contextual understanding. Process each query through these steps:
-        ## Query Analysis and Enhancement
-        ### Analysis Steps:
-        1. SCAN CONVERSATION HISTORY
-        - Previous questions and their topics
-        - Established context and key information
-        - Ongoing discussion themes
-
-        2. IDENTIFY CONTEXTUAL ELEMENTS
-        - Pronouns (it, they, this, that)
-        - Implicit references to previous topics
-        - Time-based references
-        - Location mentions
-        - Subject continuity markers
-
-        3. QUERY RECONSTRUCTION
-        - Replace pronouns with specific references
-        - Add missing context from previous exchanges
-        - Keep critical keywords intact
-        - Maintain technical precision
-        - Create concise, self-contained question
-        
-        Finally respond with update query only in following format:
-        `<query>{updated query}</query>`
-        """
-        
-        if self.memory:
-            last_exchanges = self.memory[-2:]
-            prompt += f"\n\nLast Exchanges:\n{last_exchanges[0]['content']}\n{last_exchanges[1]['content']}"
+    def _planning_request(self, question: str) -> Tuple[Dict, bool]:
+        """Keyword arguments of the query planning call, and whether it rewrites.
 
-        messages = [
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": question}
-        ]
-        
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.2,
-            max_tokens=300
-        )
-        
-        match = re.search(r'<query>(.*?)</query>', response.choices[0].message.content.strip())
-        if match:
-            return match.group(1)
-        return question
-    
-    def _get_relevant_questions(self, question: str) -> List[str]:
+        The rewrite against the last exchange only happens when there is
+        conversation memory; a first question is used as asked and only
+        expanded into search queries.
+        """
+        rewrite = len(self.memory) >= 2
         prompt = """
-        You are an AI specialized in extracting search keywords. Your task is to:
-        1. Analyze the question and chat history
-        2. Extract 2-3 SHORT, focused search queries
-        3. Each query should:
+        You are an AI specialized in query processing and extracting search keywords.
+        """
+        if rewrite:
+            prompt += """
+        First, rewrite the question as a standalone question:
+        - Replace pronouns (it, they, this, that) with specific references
+        - Add missing context from the previous exchange
+        - Keep critical keywords intact and maintain technical precision
+        - Keep it concise and self-contained
+        """
+        prompt += """
+        Then extract 2-3 SHORT, focused search queries for the {question}. Each query should:
            - Be 3-5 words maximum
            - Contain important keywords from the question
            - Remove stop words and unnecessary context
            - Focus on technical terms and specific entities
 
         FORMAT YOUR RESPONSE EXACTLY AS:
-        <queries>
+        {format}<queries>
         query1
         query2
         query3
@@ -145,39 +181,72 @@ class RagSystem:
 
         Example:
         Question: "What are the environmental impacts of solar panel manufacturing?"
-        <queries>
+        {example}<queries>
         solar panel manufacturing impact
         solar environmental effects
         panel production pollution
         </queries>
-        """
-        
-        if self.memory:
-            context = "\nPrevious exchange:\n"
-            context += f"Q: {self.memory[-2]['content']}\n"
-            context += f"A: {self.memory[-1]['content']}"
-            prompt += context
+        """.format(
+            question="standalone question" if rewrite else "question",
+            format="<query>{standalone question}</query>\n        " if rewrite else "",
+            example="<query>What are the environmental impacts of solar panel manufacturing?</query>\n        " if rewrite else ""
+        )
+
+        if rewrite:
+            prompt += "\nPrevious exchange:\n"
+            prompt += f"Q: {self.memory[-2]['content']}\n"
+            prompt += f"A: {self.memory[-1]['content']}"
 
         messages = [
             {"role": "system", "content": prompt},
             {"role": "user", "content": f"Question: {question}"}
         ]
+        return {
+            "model": "gpt-4o-mini",
+            "messages": messages,
+            "temperature": 0.2,
+            "max_tokens": 300 if rewrite else 200
+        }, rewrite
 
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                temperature=0.2,
-                max_tokens=200
-            )
-            
-            queries = self._parse_queries(response.choices[0].message.content.strip())
-            queries.append(question)
-            return queries
-            
-        except Exception as e:
-            self.logger.error(f"Error generating queries: {str(e)}")
-            return [question]
+    def _parse_plan(self, content: str, question: str, rewrite: bool) -> Tuple[str, List[str]]:
+        standalone = question
+        match = re.search(r'<query>(.*?)</query>', content, re.DOTALL)
+        if rewrite and match and match.group(1).strip():
+            standalone = match.group(1).strip()
+        queries = self._parse_queries(content)
+        queries.append(standalone)
+        return standalone, queries
+
+    def _plan_queries(self, question: str) -> Tuple[str, List[str]]:
+        """Standalone question and search queries from a single LLM call.
+
+        The planning call is deterministic enough (temperature 0.2) to be
+        served from the response cache when the same request recurs.
+        """
+        request, rewrite = self._planning_request(question)
+        content = self.response_cache.get(request)
+        if content is None:
+            try:
+                response = self.client.chat.completions.create(**request)
+            except Exception as e:
+                self.logger.error(f"Error generating queries: {str(e)}")
+                return question, [question]
+            content = response.choices[0].message.content.strip()
+            self.response_cache.put(request, content)
+        return self._parse_plan(content, question, rewrite)
+
+    async def _aplan_queries(self, question: str) -> Tuple[str, List[str]]:
+        request, rewrite = self._planning_request(question)
+        content = self.response_cache.get(request)
+        if content is None:
+            try:
+                response = await self.async_client.chat.completions.create(**request)
+            except Exception as e:
+                self.logger.error(f"Error generating queries: {str(e)}")
+                return question, [question]
+            content = response.choices[0].message.content.strip()
+            self.response_cache.put(request, content)
+        return self._parse_plan(content, question, rewrite)
 
     def _parse_queries(self, content: str) -> List[str]:
         queries = []
@@ -186,47 +255,117 @@ class RagSystem:
             queries = [q.strip() for q in match.group(1).strip().split('\n') if q.strip()]
         return queries if queries else []
 
-    def chat(self, question: str) -> Dict:
+    NO_ANSWER = "I couldn't find any relevant information to answer your question."
+
+    def _cache_scope(self) -> Tuple:
+        # Cached answers are only valid for the same index contents and settings
+        return self.vector_db.version, tuple(sorted(vars(self.settings).items()))
+
+    def _begin_turn(self, question: str) -> Dict:
+        """Standalone question, its embedding and the answer cache lookup.
+
+        A first question needs no rewrite, so the cache is checked before
+        any LLM call, and a repeated one only costs an embedding lookup in
+        the query cache. With memory, the fused planning call runs first
+        and its queries are kept for a miss.
+        """
+        if not self.settings:
+            raise RuntimeError("Settings not configured")
+
+        turn = {"scope": self._cache_scope(), "queries": None, "question": question}
+        if len(self.memory) >= 2:
+            turn["question"], turn["queries"] = self._plan_queries(question)
+        turn["embedding"] = self.vector_db.query_embedding(turn["question"])
+        turn["hit"] = self.answer_cache.get(turn["embedding"], turn["scope"])
+        return turn
+
+    async def _abegin_turn(self, question: str) -> Dict:
         if not self.settings:
             raise RuntimeError("Settings not configured")
 
+        turn = {"scope": self._cache_scope(), "queries": None, "question": question}
+        if len(self.memory) >= 2:
+            turn["question"], turn["queries"] = await self._aplan_queries(question)
+        turn["embedding"] = (await self.vector_db.aget_query_embeddings([turn["question"]]))[0]
+        turn["hit"] = self.answer_cache.get(turn["embedding"], turn["scope"])
+        return turn
+
+    def _prepare_answer(self, question: str, turn: Dict) -> Tuple[Optional[List[Dict]], List[Dict]]:
+        """Answer-call messages (None when nothing relevant was found) and sources"""
+        # One round trip rewrites and expands the question before the answer call
+        search_queries = turn["queries"] or self._plan_queries(question)[1]
+        unique_docs = self._search(search_queries)
+        return self._answer_messages(question, search_queries, unique_docs)
+
+    async def _aprepare_answer(self, question: str, turn: Dict) -> Tuple[Optional[List[Dict]], List[Dict]]:
+        search_queries = turn["queries"] or (await self._aplan_queries(question))[1]
+        query_embeddings = None
+        if self.settings.use_semantic:
+            # Fetched on the loop, so the scoring thread only does CPU work
+            query_embeddings = await self.vector_db.aget_query_embeddings(search_queries)
+        loop = asyncio.get_running_loop()
+        unique_docs = await loop.run_in_executor(
+            get_scoring_pool(), self._search, search_queries, query_embeddings
+        )
+        return self._answer_messages(question, search_queries, unique_docs)
+
+    def _search(self, search_queries: List[str], query_embeddings: Optional[np.ndarray] = None) -> List[Dict]:
+        self.logger.info("Generated search queries:")
+        for query in search_queries:
+            self.logger.info(f" >>> query: {query}")
+
+        unique_docs = self.vector_db.search_many(search_queries, self.settings, k=2, query_embeddings=query_embeddings)
+        self.logger.info(f" >>> docs: {len(unique_docs)}")
+        return unique_docs
+
+    def _answer_messages(
+        self,
+        question: str,
+        search_queries: List[str],
+        unique_docs: List[Dict]
+    ) -> Tuple[Optional[List[Dict]], List[Dict]]:
+        if not unique_docs:
+            return None, []
+
+        context = self._format_context(unique_docs)
+        system_message = self._get_system_prompt() + "\n\nQuery Analysis:\n"
+        for query in search_queries:
+            system_message += f"\nQuery: {query}"
+
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "system", "content": context},
+            {"role": "user", "content": question}
+        ]
+        # Near-duplicate chunks are indexed once but cite every source
+        sources = [{
+            "title": source["title"],
+            "similarity": doc['similarity']
+        } for doc in unique_docs for source in doc['metadata'].get("sources", [doc['metadata']])]
+        return messages, sources
+
+    def _remember(self, question: str, answer: str) -> None:
+        self.memory.extend([
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": answer}
+        ])
+
+    def _finish_turn(self, question: str, turn: Dict, result: Dict) -> Dict:
+        self._remember(question, result["answer"])
+        if result["sources"]:
+            self.answer_cache.put(turn["embedding"], turn["scope"], result)
+        return result
+
+    def chat(self, question: str) -> Dict:
         try:
-            updated_question = self._update_query(question)
-            search_queries = self._get_relevant_questions(updated_question)
-            
-            self.logger.info("Generated search queries:")
-            all_relevant_docs = []
-            
-            for query in search_queries:
-                docs = self.vector_db.search(query, self.settings, k=2)
-                if docs:
-                    all_relevant_docs.extend(docs)
-                self.logger.info(f" >>> query: {query}\t docs: {len(docs)}")
-
-            if not all_relevant_docs:
-                return {
-                    "answer": "I couldn't find any relevant information to answer your question.",
-                    "sources": []
-                }
-            
-            seen_contents = set()
-            unique_docs = []
-            for doc in all_relevant_docs:
-                content = doc['metadata']['content']
-                if content not in seen_contents:
-                    seen_contents.add(content)
-                    unique_docs.append(doc)
-
-            context = self._format_context(unique_docs)
-            system_message = self._get_system_prompt() + "\n\nQuery Analysis:\n"
-            for query in search_queries:
-                system_message += f"\nQuery: {query}"
-
-            messages = [
-                {"role": "system", "content": system_message},
-                {"role": "system", "content": context},
-                {"role": "user", "content": question}
-            ]
+            turn = self._begin_turn(question)
+            if turn["hit"]:
+                self._remember(question, turn["hit"]["answer"])
+                return turn["hit"]
+
+            messages, sources = self._prepare_answer(question, turn)
+            if messages is None:
+                return {"answer": self.NO_ANSWER, "sources": []}
 
             response = self.client.chat.completions.create(
                 model="gpt-4o-mini",
@@ -236,18 +375,82 @@ class RagSystem:
             )
 
             answer = response.choices[0].message.content
-            self.memory.extend([
-                {"role": "user", "content": question},
-                {"role": "assistant", "content": answer}
-            ])
-
-            return {
-                "answer": answer,
-                "sources": [{
-                    "title": doc['metadata']["title"],
-                    "similarity": doc['similarity']
-                } for doc in unique_docs]
-            }
+            return self._finish_turn(question, turn, {"answer": answer, "sources": sources})
+
+        except Exception as e:
+            self.logger.error(f"Error in chat: {str(e)}")
+            raise RuntimeError(f"Failed to generate response: {str(e)}")
+
+    async def achat(self, question: str) -> Dict:
+        """``chat`` without blocking the event loop.
+
+        LLM and embedding requests go through AsyncOpenAI; hybrid scoring
+        runs on the bounded scoring thread pool (see get_scoring_pool).
+        """
+        try:
+            turn = await self._abegin_turn(question)
+            if turn["hit"]:
+                self._remember(question, turn["hit"]["answer"])
+                return turn["hit"]
+
+            messages, sources = await self._aprepare_answer(question, turn)
+            if messages is None:
+                return {"answer": self.NO_ANSWER, "sources": []}
+
+            response = await self.async_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=self.settings.temperature,
+                max_tokens=self.settings.max_token
+            )
+
+            answer = response.choices[0].message.content
+            return self._finish_turn(question, turn, {"answer": answer, "sources": sources})
+
+        except Exception as e:
+            self.logger.error(f"Error in chat: {str(e)}")
+            raise RuntimeError(f"Failed to generate response: {str(e)}")
+
+    def chat_stream(self, question: str) -> Iterator[Dict]:
+        """``chat`` as events: sources first, answer deltas as generated, then done.
+
+        Yields {"type": "sources", "sources": [...]}, then one
+        {"type": "delta", "content": text} per streamed completion chunk and
+        finally {"type": "done", "answer": ..., "sources": [...]}. Memory is
+        only updated once the answer is complete.
+        """
+        try:
+            turn = self._begin_turn(question)
+            if turn["hit"]:
+                self._remember(question, turn["hit"]["answer"])
+                yield {"type": "sources", "sources": turn["hit"]["sources"]}
+                yield {"type": "delta", "content": turn["hit"]["answer"]}
+                yield {"type": "done", **turn["hit"]}
+                return
+
+            messages, sources = self._prepare_answer(question, turn)
+            yield {"type": "sources", "sources": sources}
+            if messages is None:
+                yield {"type": "delta", "content": self.NO_ANSWER}
+                yield {"type": "done", "answer": self.NO_ANSWER, "sources": []}
+                return
+
+            stream = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=self.settings.temperature,
+                max_tokens=self.settings.max_token,
+                stream=True
+            )
+            parts = []
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield {"type": "delta", "content": delta}
+
+            answer = "".join(parts)
+            yield {"type": "done", **self._finish_turn(question, turn, {"answer": answer, "sources": sources})}
 
         except Exception as e:
             self.logger.error(f"Error in chat: {str(e)}")
@@ -265,12 +468,8 @@ class RagSystem:
             raise ValueError("Invalid settings: weights must sum to 1.0")
         
         self.settings = new_settings
+        self.answer_cache.invalidate()
         self.logger.info("Settings updated successfully")
         
         if hasattr(self.vector_db, 'update_settings'):
             self.vector_db.update_settings(new_settings)
-
-    def _reset_caches(self) -> None:
-        """Reset any caches that might be affected by settings changes."""
-        self.query_cache = {}
-        self.memory = []
\ No newline at end of file
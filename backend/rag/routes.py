@@ -8,7 +8,11 @@ from database import Database
 from session_store import SessionStore
 
 from models.rag import RagSession, ChatMessage, Source, RagSessionResonse, SettingsConfig
-from rag.rag_system import RagSystem
+from rag.rag_system import RagSystem, LLM_CACHE_PATH
+from rag.embedding_cache import get_embedding_cache
+from rag.query_cache import get_query_cache
+from buddy.model.cache import get_response_cache
+from managers.ingestion_manager import ingestion_manager, IngestionLimitError
 
 router = APIRouter()
 
@@ -48,7 +52,7 @@ async def create_session(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create session: {str(e)}")
 
-@router.post("/{session_id}/upload")
+@router.post("/{session_id}/upload", status_code=202)
 async def upload_files(
     session_id: str,
     files: List[UploadFile] = File(...),
@@ -73,26 +77,43 @@ async def upload_files(
         )
         SessionStore.set_session(session_id, rag_system)
 
-    try:
-        processed_files = []
-        for file in files:
-            processed_files.append(file.filename)
-        
-        total_chunks = await rag_system.process_files(files)
-        print(f"Processed {len(files)} files into {total_chunks} chunks")
-
+    async def record_documents(job):
         await collection.update_one(
             {"_id": ObjectId(session_id)},
             {
-                "$push": {"documents": {"$each": processed_files}},
+                "$push": {"documents": {"$each": [filename for _, filename in job.files]}},
                 "$set": {"updated_at": datetime.utcnow()}
             }
         )
-        
-        return {"message": f"Processed {len(files)} files into {total_chunks} chunks"}
+
+    # Files are spooled to disk and ingested in the background; progress is
+    # sent over the session's WebSocket and from the job endpoint
+    try:
+        job = await ingestion_manager.submit(
+            session_id,
+            str(user["_id"]),
+            rag_system,
+            files,
+            on_complete=record_documents
+        )
+    except IngestionLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    return {"message": f"Queued {len(files)} files for processing", "job_id": job.id, "status": job.status}
+
+@router.get("/{session_id}/jobs/{job_id}")
+async def get_job(
+    session_id: str,
+    job_id: str,
+    user = Depends(get_current_user)
+):
+    job = ingestion_manager.get(job_id)
+    if not job or job.session_id != session_id or job.user_id != str(user["_id"]):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
 @router.get("/history")
 async def get_chat_history(user = Depends(get_current_user)):
     collection = await Database.get_collection("rag_sessions")
@@ -102,6 +123,32 @@ async def get_chat_history(user = Depends(get_current_user)):
         sessions.append(RagSession.parse_obj(session).to_response())
     return sessions[::-1]
 
+@router.get("/cache/stats")
+async def get_cache_stats(user = Depends(get_current_user)):
+    return {
+        **get_embedding_cache().stats(),
+        "queries": get_query_cache().stats(),
+        "llm_responses": get_response_cache(LLM_CACHE_PATH).stats()
+    }
+
+@router.get("/{session_id}/answer-cache/stats")
+async def get_answer_cache_stats(
+    session_id: str,
+    user = Depends(get_current_user)
+):
+    collection = await Database.get_collection("rag_sessions")
+    session_doc = await collection.find_one({
+        "_id": ObjectId(session_id), 
+        "user_id": str(user["_id"])
+    })
+    if not session_doc:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    rag_system = SessionStore.get_session(session_id)
+    if not rag_system:
+        raise HTTPException(status_code=400, detail="Session not initialized")
+    return rag_system.answer_cache.stats()
+
 @router.get("/session/{session_id}", response_model=RagSessionResonse)
 async def get_session(
     session_id: str,
@@ -151,7 +198,7 @@ async def chat(
             timestamp=datetime.utcnow()
         )
         
-        response = rag_system.chat(message)
+        response = await rag_system.achat(message)
         ai_message = ChatMessage(
             role="ai",
             content=response["answer"],
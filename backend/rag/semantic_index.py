@@ -0,0 +1,239 @@
+import os
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional, Type
+
+import numpy as np
+
+from rag.embedding_matrix import EmbeddingMatrix
+
+DEFAULT_ANN_BACKEND = os.getenv("RAG_ANN_BACKEND", "ivfpq")
+DEFAULT_ANN_THRESHOLD = int(os.getenv("RAG_ANN_THRESHOLD", "50000"))
+DEFAULT_ANN_CANDIDATES = int(os.getenv("RAG_ANN_CANDIDATES", "256"))
+# ``benchmarks.ivfpq_tune --out`` file whose parameters the IVF-PQ backend trains with
+DEFAULT_ANN_TUNED = os.getenv("RAG_ANN_TUNED") or None
+# float16 or int8 rerank store for IVF-PQ candidates; float32 reranks from the matrix
+DEFAULT_ANN_RERANK_DTYPE = os.getenv("RAG_ANN_RERANK_DTYPE", "float16")
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticIndex:
+    """Semantic scoring backend over an EmbeddingMatrix.
+
+    The matrix stays the source of truth (it is what gets persisted);
+    approximate backends are derived from it on first use and fed the rows
+    appended since by ``sync``. ``scores_many`` always returns a dense
+    (n_queries, n_rows) array so it fuses with the keyword and graph
+    signals; approximate backends fill in the exact cosine for their
+    candidates and leave every other chunk at 0.
+    """
+
+    name = "flat"
+    approximate = False
+
+    def __init__(self, matrix: EmbeddingMatrix):
+        self.matrix = matrix
+        self.size = len(matrix)
+
+    def sync(self) -> None:
+        """Index rows appended to the matrix since the last call."""
+        self.size = len(self.matrix)
+
+    @property
+    def stale(self) -> bool:
+        """Whether the matrix has outgrown what the index was built for."""
+        return False
+
+    def _search(self, queries: np.ndarray, candidates: int) -> np.ndarray:
+        raise NotImplementedError
+
+    def _rerank_rows(self, ids: np.ndarray) -> np.ndarray:
+        return self.matrix.matrix[ids]
+
+    def scores_many(self, queries: np.ndarray, candidates: int = DEFAULT_ANN_CANDIDATES) -> np.ndarray:
+        if not self.approximate:
+            return self.matrix.scores_many(queries)
+
+        queries = EmbeddingMatrix.normalize(queries)
+        ids = self._search(queries, min(candidates, self.size))
+        scores = np.zeros((len(queries), len(self.matrix)), dtype=np.float32)
+        for query_idx, query_ids in enumerate(ids):
+            query_ids = query_ids[query_ids >= 0]
+            # Exact rerank against the stored rows
+            scores[query_idx, query_ids] = self._rerank_rows(query_ids) @ queries[query_idx]
+        return scores
+
+
+def load_tuned_params(path: Optional[str] = DEFAULT_ANN_TUNED) -> Optional[Dict[str, Any]]:
+    """Parameters chosen by benchmarks.ivfpq_tune, or None to use the heuristics."""
+    if not path:
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+class IVFPQIndex(SemanticIndex):
+    """PCA + IVF-PQ, trained and sized as IVFPQVectorDB is (see rag.ivfpq).
+
+    Tuned parameters (RAG_ANN_TUNED) win over the sizing heuristics, and
+    candidates are reranked from a float16 or int8 RawVectorStore
+    (RAG_ANN_RERANK_DTYPE). Appended rows are encoded with the trained
+    index; once their quantization error or the list imbalance drifts past
+    the thresholds, or the corpus has grown fourfold, the index reports
+    itself stale and SemanticRouter retrains it in the background.
+    """
+
+    name = "ivfpq"
+    approximate = True
+
+    def __init__(
+        self,
+        matrix: EmbeddingMatrix,
+        nprobe: Optional[int] = None,
+        tuned_params: Optional[Dict[str, Any]] = None,
+        raw_dtype: str = DEFAULT_ANN_RERANK_DTYPE,
+        max_training: int = 50000,
+        error_drift: float = 1.25,
+        imbalance_drift: float = 1.5
+    ):
+        super().__init__(matrix)
+        self.tuned_params = tuned_params if tuned_params is not None else load_tuned_params()
+        self.nprobe = nprobe or (self.tuned_params or {}).get("nprobe", 32)
+        self.raw_dtype = raw_dtype
+        self.max_training = max_training
+        self.error_drift = error_drift
+        self.imbalance_drift = imbalance_drift
+        self._build()
+
+    def _build(self) -> None:
+        from rag.ivfpq import RawVectorStore, DriftTracker, sample_ids, train_index
+
+        vectors = self.matrix.matrix
+        n = len(vectors)
+        sample = np.ascontiguousarray(vectors[sample_ids(n, self.max_training)])
+        self.pca_matrix, self.index, self.params, baseline_error = train_index(sample, n, self.tuned_params)
+        self.index.nprobe = self.nprobe
+        self.drift = DriftTracker(baseline_error)
+        self.raw_vectors = RawVectorStore(self.raw_dtype) if self.raw_dtype != "float32" else None
+
+        self.size = 0
+        self.trained_size = n
+        self._add(n)
+
+    def _add(self, n: int) -> None:
+        from rag.ivfpq import quantization_error
+
+        vectors = np.ascontiguousarray(self.matrix.matrix[self.size:n])
+        self.index.add(self.pca_matrix.apply(vectors))
+        if self.raw_vectors is not None:
+            self.raw_vectors.add(vectors)
+        self.drift.observe(self.index, quantization_error(self.pca_matrix, self.index, vectors))
+        self.size = n
+
+    def sync(self) -> None:
+        n = len(self.matrix)
+        if n > self.size:
+            self._add(n)
+
+    @property
+    def stale(self) -> bool:
+        return (
+            self.drift.exceeded(self.index, self.error_drift, self.imbalance_drift)
+            or len(self.matrix) > 4 * self.trained_size
+        )
+
+    def _search(self, queries: np.ndarray, candidates: int) -> np.ndarray:
+        _, ids = self.index.search(self.pca_matrix.apply(queries), candidates)
+        return ids
+
+    def _rerank_rows(self, ids: np.ndarray) -> np.ndarray:
+        if self.raw_vectors is None:
+            return super()._rerank_rows(ids)
+        return self.raw_vectors.gather(ids)
+
+
+class HNSWIndex(SemanticIndex):
+    """HNSW graph over the full-precision rows (inner product)."""
+
+    name = "hnsw"
+    approximate = True
+
+    def __init__(self, matrix: EmbeddingMatrix, m: int = 32, ef_construction: int = 80, ef_search: int = 128):
+        import faiss
+
+        super().__init__(matrix)
+        self.index = faiss.IndexHNSWFlat(matrix.dimension, m, faiss.METRIC_INNER_PRODUCT)
+        self.index.hnsw.efConstruction = ef_construction
+        self.index.hnsw.efSearch = ef_search
+        self.size = 0
+        self.sync()
+
+    def sync(self) -> None:
+        n = len(self.matrix)
+        if n > self.size:
+            self.index.add(np.ascontiguousarray(self.matrix.matrix[self.size:n]))
+            self.size = n
+
+    def _search(self, queries: np.ndarray, candidates: int) -> np.ndarray:
+        # efSearch bounds the candidate list, so it must cover the request
+        self.index.hnsw.efSearch = max(self.index.hnsw.efSearch, candidates)
+        _, ids = self.index.search(queries, candidates)
+        return ids
+
+
+BACKENDS: Dict[str, Type[SemanticIndex]] = {
+    "flat": SemanticIndex,
+    "ivfpq": IVFPQIndex,
+    "hnsw": HNSWIndex,
+}
+
+
+class SemanticRouter:
+    """Picks flat scoring below ``threshold`` chunks and ``backend`` above it.
+
+    The approximate index is built on a background thread the first time a
+    search sees the store at or above the threshold; searches keep using
+    flat scoring until it is ready, and it is then kept in sync with later
+    appends. A stale index (see ``SemanticIndex.stale``) keeps serving while
+    its replacement is built. The index is dropped whenever the store swaps
+    in a new matrix (reset or load).
+    """
+
+    def __init__(self, backend: str = DEFAULT_ANN_BACKEND, threshold: int = DEFAULT_ANN_THRESHOLD):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown ANN backend: {backend}")
+        self.backend = backend
+        self.threshold = threshold
+        self._index = None
+        self._building = None  # matrix an index is being built for
+        self._failed = None  # matrix whose build failed; it stays on flat scoring
+        self._lock = threading.Lock()
+
+    def index_for(self, matrix: EmbeddingMatrix) -> SemanticIndex:
+        if self.backend == "flat" or len(matrix) < self.threshold:
+            return SemanticIndex(matrix)
+        with self._lock:
+            index = self._index if self._index is not None and self._index.matrix is matrix else None
+            if (index is None or index.stale) and self._building is not matrix and self._failed is not matrix:
+                self._building = matrix
+                threading.Thread(target=self._build, args=(matrix,), name="rag-ann-build", daemon=True).start()
+            if index is None:
+                return SemanticIndex(matrix)
+            index.sync()
+            return index
+
+    def _build(self, matrix: EmbeddingMatrix) -> None:
+        try:
+            index = BACKENDS[self.backend](matrix)
+        except Exception as e:
+            logger.error(f"Failed to build {self.backend} index, using flat scoring: {str(e)}")
+            index = None
+        with self._lock:
+            if self._building is matrix:
+                self._building = None
+                if index is None:
+                    self._failed = matrix
+                else:
+                    self._index = index
@@ -1,41 +1,98 @@
 import os 
+import threading
 import json
 import pickle
-from typing import Optional, List, Set, Dict, Any
-from openai import OpenAI
+from typing import Callable, Optional, List, Set, Dict, Any, Tuple
+from openai import OpenAI, AsyncOpenAI
 from dataclasses import dataclass
 
-from sklearn.preprocessing import normalize
-from rank_bm25 import BM25Okapi
-import networkx as nx
 import numpy as np
-import spacy
 
 from models.rag import SettingsConfig
+from rag.embedding_matrix import EmbeddingMatrix
+from rag.embedding_cache import EmbeddingCache, get_embedding_cache
+from rag.query_cache import QueryEmbeddingCache, get_query_cache, normalize_query
+from rag.embedding_client import AsyncEmbeddingClient
+from rag.bm25 import SparseBM25
+from rag.knowledge_graph import KnowledgeGraph
+from rag.semantic_index import SemanticRouter, DEFAULT_ANN_BACKEND, DEFAULT_ANN_THRESHOLD
+from rag.index_store import IndexStore, ColumnList
+from rag.chunk_store import ChunkStore
+from rag.dedup import NearDuplicateIndex, DEFAULT_DEDUP_THRESHOLD
+from rag.nlp import DEFAULT_NLP_MODEL, get_nlp, analyze_texts
+
+# Pending delta segments past which an ingest folds them into a new snapshot
+COMPACT_DELTAS = int(os.getenv("RAG_COMPACT_DELTAS", "16"))
 
 class SimilarityMatching:
-    def __init__(self, api_key: str, db_path: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: str,
+        db_path: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None,
+        nlp_model: Optional[str] = None,
+        ann_backend: Optional[str] = None,
+        ann_threshold: Optional[int] = None,
+        tokenizer=None,
+        dedup_threshold: Optional[float] = None,
+        query_cache: Optional[QueryEmbeddingCache] = None
+    ):
         if not api_key:
             raise ValueError("API key cannot be empty")
         
         try:
             self.client = OpenAI(api_key=api_key)
+            self.async_client = AsyncOpenAI(api_key=api_key)
         except Exception as e:
             raise ValueError(f"Failed to initialize OpenAI client: {str(e)}")
 
-        self.db_path = db_path if db_path else "data/hybrid_similarity.pkl"
+        # db_path names the store directory; a legacy ``<db_path>.pkl``
+        # snapshot is migrated on the first load_db
+        db_path = db_path if db_path else "data/hybrid_similarity"
+        base, ext = os.path.splitext(db_path)
+        self.db_path = base if ext == ".pkl" else db_path
+        self._legacy_path = f"{self.db_path}.pkl"
+        self.store = IndexStore(self.db_path)
+        self.embedding_model = "text-embedding-3-small"
+        self.embedding_client = AsyncEmbeddingClient(api_key, self.embedding_model, tokenizer=tokenizer)
+        self.nlp_model = nlp_model or DEFAULT_NLP_MODEL
+        self.cache = cache if cache is not None else get_embedding_cache()
         
-        self.embeddings = []
-        self.documents = []
-        self.metadata = []
-        self.query_cache = {} # Cache for query embeddings
+        self._matrix = EmbeddingMatrix()
+        self.semantic = SemanticRouter(
+            ann_backend or DEFAULT_ANN_BACKEND,
+            DEFAULT_ANN_THRESHOLD if ann_threshold is None else ann_threshold
+        )
+        self.chunks = ChunkStore()
+        self.dedup_threshold = DEFAULT_DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold
+        self.dedup = NearDuplicateIndex(self.dedup_threshold)
+        # Shared with every session; kept out of the index files
+        self.query_cache = query_cache if query_cache is not None else get_query_cache()
+        self.version = 0  # Bumped whenever the indexed contents change
+        # Writers are serialized for a whole ingest; _lock is only held while
+        # the index is mutated or scored, so searches never see the matrix,
+        # chunk store, BM25 and graph at different sizes
+        self._write_lock = threading.RLock()
+        self._lock = threading.RLock()
         
-        self.bm25 = None
-        self.tokenized_docs = []
+        self.bm25 = SparseBM25()
+
+        self.knowledge_graph = KnowledgeGraph()
+
+    @property
+    def nlp(self):
+        # Shared across sessions; loaded once per worker on first use
+        return get_nlp(self.nlp_model)
 
-        self.nlp = spacy.load("en_core_web_lg")
-        self.knowledge_graph = nx.Graph()
-        self.entity_doc_map = {} 
+    @property
+    def metadata(self) -> ChunkStore:
+        # Chunk dicts are built from the stored spans when indexed
+        return self.chunks
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        # Unit-normalized float32 rows, kept contiguous for BLAS scoring.
+        return self._matrix.matrix
 
     def _get_embedding(self, text: str) -> List[float]:
         if not text:
@@ -44,227 +101,561 @@ class SimilarityMatching:
         try:
             res = self.client.embeddings.create(
                 input=text,
-                model="text-embedding-3-small"
+                model=self.embedding_model
             )
             return res.data[0].embedding
         except Exception as e:
             raise RuntimeError(f"Failed to get embedding: {str(e)}")
 
-    def _get_batch_embeddings(self, texts: List[str], batch_size: int = 128) -> List[List[float]]:
+    def _get_batch_embeddings(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[int], None]] = None
+    ) -> List[List[float]]:
+        # Requests are packed by token count; batch_size only caps inputs.
+        # on_progress gets the number of texts embedded so far, cache hits
+        # first and then after every request.
         if not texts:
             raise ValueError("Texts list cannot be empty")
-        if batch_size < 1:
+        if batch_size is not None and batch_size < 1:
             raise ValueError("Batch size must be positive")
 
-        all_embeddings = []
+        all_embeddings = self.cache.get_embeddings(self.embedding_model, texts)
+        missing = [i for i, embedding in enumerate(all_embeddings) if embedding is None]
+        done = len(texts) - len(missing)
+        if on_progress is not None:
+            on_progress(done)
+        if not missing:
+            return all_embeddings
+
+        # Inputs are deduplicated per request, so progress counts positions
+        positions = {}
+        for idx in missing:
+            positions[texts[idx]] = positions.get(texts[idx], 0) + 1
+
+        def on_batch(batch: List[str], vectors: List[List[float]]) -> None:
+            nonlocal done
+            self.cache.put_embeddings(self.embedding_model, batch, vectors)
+            if on_progress is not None:
+                done += sum(positions[text] for text in batch)
+                on_progress(done)
+
         try:
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                res = self.client.embeddings.create(
-                    input=batch,
-                    model="text-embedding-3-small"
-                )
-                batch_embeddings = [item.embedding for item in res.data]
-                all_embeddings.extend(batch_embeddings)
+            # Each finished batch lands in the cache at once, so a retry after
+            # a partial failure only re-embeds the batches that failed
+            new_embeddings = self.embedding_client.embed_sync(
+                [texts[idx] for idx in missing],
+                batch_size=batch_size,
+                on_batch=on_batch
+            )
+            for idx, embedding in zip(missing, new_embeddings):
+                all_embeddings[idx] = embedding
             return all_embeddings
         except Exception as e:
             raise RuntimeError(f"Failed to get batch embeddings: {str(e)}")
     
-    def _extract_entities_and_relations(self, text: str, doc_idx: int) -> Set[str]:
-        doc = self.nlp(text)
-        entities = set()
-        
-        # Extract entities and add to graph
-        for ent in doc.ents:
-            entity_text = ent.text.lower()
-            entities.add(entity_text)
-            
-            if not self.knowledge_graph.has_node(entity_text):
-                self.knowledge_graph.add_node(entity_text, label=ent.label_)
-            
-            if entity_text not in self.entity_doc_map:
-                self.entity_doc_map[entity_text] = set()
-            self.entity_doc_map[entity_text].add(doc_idx)
-
-        for sent in doc.sents:
-            sent_entities = [ent.text.lower() for ent in sent.ents]
-            for i in range(len(sent_entities)):
-                for j in range(i + 1, len(sent_entities)):
-                    self.knowledge_graph.add_edge(
-                        sent_entities[i],
-                        sent_entities[j],
-                        weight=1.0
-                    )
-        
-        return entities
+    def _analyze_texts(
+        self,
+        texts: List[str],
+        on_progress: Optional[Callable[[int], None]] = None
+    ) -> List[Dict[str, Any]]:
+        analyses = self.cache.get_analyses(self.nlp_model, texts)
+        missing = [i for i, analysis in enumerate(analyses) if analysis is None]
+        cached = len(texts) - len(missing)
+        if on_progress is not None:
+            on_progress(cached)
+        if missing:
+            new_analyses = analyze_texts(
+                [texts[i] for i in missing],
+                self.nlp_model,
+                on_batch=None if on_progress is None else lambda done: on_progress(cached + done)
+            )
+            self.cache.put_analyses(self.nlp_model, [texts[i] for i in missing], new_analyses)
+            for idx, analysis in zip(missing, new_analyses):
+                analyses[idx] = analysis
+        return analyses
+
+    def _index(self, embeddings: np.ndarray, extractions: List[Dict[str, Any]]) -> None:
+        # Scores the chunks most recently added to self.chunks
+        offset = len(self._matrix)
+
+        self._matrix.append(embeddings)
+        self.bm25.add([extraction["tokens"] for extraction in extractions])
+
+        for idx, extraction in enumerate(extractions):
+            self.knowledge_graph.add(extraction, offset + idx)
+
+    def _embed_and_analyze(self, texts: List[str], progress: Optional[Callable[[str, int, int], None]] = None):
+        # progress(stage, done, total) after every embedding request and
+        # analysis batch, with stage "embedding" or "analyzing"
+        if not all(texts):
+            raise ValueError("All items must have non-empty content")
+
+        def report(stage: str):
+            if progress is None:
+                return None
+            return lambda done: progress(stage, done, len(texts))
+
+        embeddings = np.array(self._get_batch_embeddings(texts, on_progress=report("embedding"))).astype('float32')
+        return embeddings, self._analyze_texts(texts, on_progress=report("analyzing"))
+
+    def _sync_dedup(self) -> None:
+        # Chunks replayed from deltas, loaded from older stores or added
+        # through add_documents get their band keys on demand
+        missing = range(len(self.dedup), len(self.chunks))
+        if len(missing):
+            self.dedup.add_texts([self.chunks.text(idx).lower() for idx in missing])
+
+    def add_document(
+        self,
+        document: Dict[str, Any],
+        persist: bool = True,
+        progress: Optional[Callable[[str, int, int], None]] = None
+    ) -> int:
+        """Index one extracted document (see DocumentProcessor.extract_document).
+
+        The text is stored once; each chunk is a span of it. Chunk text is
+        only sliced out, lowercased, for embedding and analysis.
+
+        Chunks that are near-duplicates (see NearDuplicateIndex) of an
+        indexed chunk, or of an earlier chunk of this document, are not
+        embedded or indexed again; they are recorded as further sources of
+        that chunk instead. Returns the number of chunks processed.
+
+        ``progress`` is called as (stage, done, total) while the new chunks
+        are embedded ("embedding") and analyzed ("analyzing").
+        """
+        spans = document["chunks"]
+        if not spans:
+            return 0
+
+        try:
+            with self._write_lock:
+                text = document["text"]
+                texts = [text[start:end].lower() for start, end, *_ in spans]
+                with self._lock:
+                    self._sync_dedup()
+                    targets, fresh, keys = self.dedup.match(texts, lambda idx: self.chunks.text(idx).lower())
+
+                embeddings, extractions = np.zeros((0, 0), dtype=np.float32), []
+                if fresh:
+                    embeddings, extractions = self._embed_and_analyze([texts[i] for i in fresh], progress)
+
+                with self._lock:
+                    positions = self.chunks.positions()
+                    doc_id = self.chunks.add_document(document["title"], text)
+                    self.chunks.add_spans(doc_id, [spans[i] for i in fresh])
+                    fresh_set = set(fresh)
+                    for i, target in enumerate(targets):
+                        if i not in fresh_set:
+                            self.chunks.add_reference(target, doc_id, spans[i])
+                    if fresh:
+                        self._index(embeddings, extractions)
+                    self.dedup.add(keys)
+                    self.version += 1
+
+                if persist:
+                    self._save_delta(positions, embeddings, extractions)
+            return len(spans)
+        except Exception as e:
+            raise RuntimeError(f"Failed to add document: {str(e)}")
+
+    def add_documents(self, data: List[Dict[str, Any]], persist: bool = True) -> int:
+        """Embed and index only ``data``, appending it to the existing store.
+
+        Items are chunk dicts with ``content`` (and optionally ``title`` and
+        page numbers); each is stored as its own source text.
+        """
+        if not data:
+            raise ValueError("Data cannot be empty")
+
+        try:
+            with self._write_lock:
+                embeddings, extractions = self._embed_and_analyze(
+                    [item.get('content', '').lower() for item in data]
+                )
+                with self._lock:
+                    positions = self.chunks.positions()
+                    self.chunks.add_items(data)
+                    self._index(embeddings, extractions)
+                    self.version += 1
+
+                if persist:
+                    self._save_delta(positions, embeddings, extractions)
+            return len(data)
+        except Exception as e:
+            raise RuntimeError(f"Failed to add documents: {str(e)}")
+
+    def _reset(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._matrix = EmbeddingMatrix()
+            self.chunks = ChunkStore()
+            self.dedup = NearDuplicateIndex(self.dedup_threshold)
+            self.bm25 = SparseBM25()
+            self.knowledge_graph = KnowledgeGraph()
 
     def load_data(self, data: List[Dict[str, Any]]) -> None:
+        """Rebuild the store from scratch with ``data`` and write a full snapshot."""
         if not data:
             raise ValueError("Data cannot be empty")
-        
-        if len(self.embeddings) > 0 and len(self.metadata) > 0:
-            return
 
         try:
-            texts = [item.get('content', '').lower() for item in data]
-            if not all(texts):
-                raise ValueError("All items must have non-empty content")
-
-            self.documents = texts
-            self.metadata = data
-            
-            all_embeddings = self._get_batch_embeddings(texts)
-            self.embeddings = np.array(all_embeddings).astype('float32')
-            
-            self.tokenized_docs = [text.split() for text in texts]
-            self.bm25 = BM25Okapi(self.tokenized_docs)
-            
-            # Build knowledge graph
-            for idx, text in enumerate(texts):
-                self._extract_entities_and_relations(text, idx)
-                
+            self._reset()
+            self.add_documents(data, persist=False)
             self.save_db()
         except Exception as e:
             raise RuntimeError(f"Failed to load data: {str(e)}")
-         
+
+    @staticmethod
+    def _split_state(prefix: str, state: Dict[str, Any]):
+        # Arrays become .npy files, string lists Arrow columns, scalars meta
+        arrays, columns, meta = {}, {}, {}
+        for key, value in state.items():
+            name = f"{prefix}_{key}"
+            if isinstance(value, np.ndarray):
+                arrays[name] = value
+            elif isinstance(value, list):
+                columns[name] = {"value": value}
+            else:
+                meta[name] = value
+        return arrays, columns, meta
+
+    @staticmethod
+    def _join_state(prefix: str, segment: Dict[str, Any], lazy: Set[str] = frozenset()) -> Dict[str, Any]:
+        # Columns named in ``lazy`` stay memory-mapped behind a ColumnList
+        state = {}
+        for source, values in segment.items():
+            for name, value in values.items():
+                if name.startswith(f"{prefix}_"):
+                    key = name[len(prefix) + 1:]
+                    if source == "tables":
+                        column = value.column("value")
+                        value = ColumnList(column) if key in lazy else column.to_pylist()
+                    state[key] = value
+        return state
+
+    def _save_delta(
+        self,
+        positions: Tuple[int, int, int],
+        embeddings: np.ndarray,
+        extractions: List[Dict[str, Any]]
+    ) -> None:
+        # Each upload is written as its own small segment; load_db replays
+        # deltas in order, so once COMPACT_DELTAS of them are pending they
+        # are folded into a new snapshot and a load stays one segment plus
+        # a bounded replay.
+        try:
+            with self._lock:
+                titles, texts, rows, refs = self.chunks.tail(*positions)
+            self.store.append_delta(
+                {
+                    "embeddings": np.asarray(embeddings, dtype=np.float32),
+                    "chunk_rows": rows,
+                    "chunk_refs": refs
+                },
+                {
+                    "sources": {"title": titles, "text": texts},
+                    "chunks": {"extraction": [json.dumps(extraction) for extraction in extractions]}
+                }
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to save database delta: {str(e)}")
+        if len(self.store.read_manifest()["deltas"]) >= COMPACT_DELTAS:
+            self._save_snapshot()
+
     def save_db(self) -> None:
+        # Only writers mutate the index, so searches can run during a save
+        with self._write_lock:
+            self._save_snapshot()
+
+    def _save_snapshot(self) -> None:
         try:
-            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-            data = {
-                "embeddings": self.embeddings,
-                "documents": self.documents,
-                "metadata": self.metadata,
-                "query_cache": self.query_cache,
-                "tokenized_docs": self.tokenized_docs,
-                "knowledge_graph": nx.node_link_data(self.knowledge_graph),
-                "entity_doc_map": self.entity_doc_map
-            }
-            
-            with open(self.db_path, "wb") as file:
-                pickle.dump(data, file)
+            # States are taken under the lock, so searches merging pending
+            # rows meanwhile cannot drop any; the files are written outside it
+            with self._lock:
+                self._sync_dedup()
+                arrays = {"embeddings": self.embeddings}
+                states = (
+                    ("chunks", self.chunks.state()),
+                    ("dedup", self.dedup.state()),
+                    ("bm25", self.bm25.state()),
+                    ("graph", self.knowledge_graph.state())
+                )
+            columns = {}
+            meta = {}
+            for prefix, state in states:
+                state_arrays, state_columns, state_meta = self._split_state(prefix, state)
+                arrays.update(state_arrays)
+                columns.update(state_columns)
+                meta.update(state_meta)
+
+            self.store.write_snapshot(arrays, columns, meta)
         except Exception as e:
             raise RuntimeError(f"Failed to save database: {str(e)}")
 
+    def _migrate_legacy(self) -> None:
+        # The single-pickle store written before IndexStore
+        with open(self._legacy_path, 'rb') as file:
+            data = pickle.load(file)
+        self._reset()
+        self._matrix = EmbeddingMatrix.from_array(data["embeddings"])
+        self.chunks.add_items(data["metadata"])
+        self.bm25.add(data["tokenized_docs"])
+        self.knowledge_graph = KnowledgeGraph.from_networkx(data["knowledge_graph"], data["entity_doc_map"])
+        self.save_db()
+        os.remove(self._legacy_path)
+
+    def exists(self) -> bool:
+        """Whether a store, or a legacy pickle to migrate, is on disk."""
+        return self.store.exists() or os.path.exists(self._legacy_path)
+
     def load_db(self) -> None:
-        if not os.path.exists(self.db_path):
-            raise FileNotFoundError(f"Database file not found at {self.db_path}")
-            
+        """Open the store, memory-mapping the snapshot and replaying deltas."""
+        with self._write_lock, self._lock:
+            self._load_store()
+
+    def _load_store(self) -> None:
+        if not self.store.exists():
+            if os.path.exists(self._legacy_path):
+                try:
+                    self._migrate_legacy()
+                    return
+                except Exception as e:
+                    raise RuntimeError(f"Failed to load database: {str(e)}")
+            raise FileNotFoundError(f"Database not found at {self.db_path}")
+
         try:
-            with open(self.db_path, 'rb') as file:
-                data = pickle.load(file)
-                self.embeddings = data["embeddings"]
-                self.documents = data["documents"]
-                self.metadata = data["metadata"]
-                self.query_cache = data["query_cache"]
-                self.tokenized_docs = data["tokenized_docs"]
-                self.knowledge_graph = nx.node_link_graph(data["knowledge_graph"])
-                self.entity_doc_map = data["entity_doc_map"]
-                
-            self.bm25 = BM25Okapi(self.tokenized_docs)
+            self._reset()
+            manifest = self.store.read_manifest()
+            if manifest["snapshot"]:
+                segment = self.store.read_segment(manifest["snapshot"])
+                arrays, tables = segment["arrays"], segment["tables"]
+
+                self._matrix = EmbeddingMatrix.from_normalized(arrays["embeddings"])
+                self.chunks = ChunkStore.from_state(self._join_state("chunks", segment, lazy={"texts"}))
+                self.dedup = NearDuplicateIndex.from_state(self._join_state("dedup", segment), self.dedup_threshold)
+                self.bm25 = SparseBM25.from_state(self._join_state("bm25", segment))
+                self.knowledge_graph = KnowledgeGraph.from_state(self._join_state("graph", segment))
+
+            for name in manifest["deltas"]:
+                segment = self.store.read_segment(name)
+                arrays, tables = segment["arrays"], segment["tables"]
+                sources = tables["sources"]
+                first_doc = len(self.chunks.titles)
+                rows = np.array(arrays["chunk_rows"], dtype=np.int32)
+                rows[:, 0] += first_doc
+                for title, text in zip(sources.column("title").to_pylist(), sources.column("text").to_pylist()):
+                    self.chunks.add_document(title, text)
+                self.chunks.add_rows(rows)
+                refs = np.array(arrays["chunk_refs"], dtype=np.int32)
+                refs[:, 1] += first_doc
+                self.chunks.add_ref_rows(refs)
+                extractions = [json.loads(item) for item in tables["chunks"].column("extraction").to_pylist()]
+                # A document whose chunks all collapsed into earlier ones
+                # adds references only
+                if extractions:
+                    self._index(arrays["embeddings"], extractions)
         except Exception as e:
             raise RuntimeError(f"Failed to load database: {str(e)}")
     
     def _get_semantic_scores(self, query_embedding: np.ndarray) -> np.ndarray:
-        # Ensure query embedding is 1D
-        query_embedding = query_embedding.ravel()
-        # Normalize and calculate dot product
-        return np.dot(normalize(self.embeddings, axis=1, norm='l2'), 
-                     normalize(query_embedding.reshape(1, -1), axis=1, norm='l2').T).ravel()
+        # Rows are normalized at ingest, so this is a single gemv
+        return self._matrix.scores(query_embedding)
+
+    def _lookup_queries(self, queries: List[str]) -> Tuple[List[str], List[Optional[np.ndarray]], List[str]]:
+        keys = [normalize_query(query) for query in queries]
+        vectors = self.query_cache.get_many(self.embedding_model, keys)
+        missing = list(dict.fromkeys(key for key, vector in zip(keys, vectors) if vector is None))
+        return keys, vectors, missing
+
+    def _store_queries(self, missing: List[str], data) -> Dict[str, np.ndarray]:
+        fetched = {query: np.asarray(item.embedding, dtype=np.float32) for query, item in zip(missing, data)}
+        self.query_cache.put_many(self.embedding_model, missing, list(fetched.values()))
+        return fetched
+
+    def _get_query_embeddings(self, queries: List[str]) -> np.ndarray:
+        # All uncached queries go out in a single embeddings request
+        keys, vectors, missing = self._lookup_queries(queries)
+        if missing:
+            try:
+                res = self.client.embeddings.create(
+                    input=missing,
+                    model=self.embedding_model
+                )
+            except Exception as e:
+                raise RuntimeError(f"Failed to get query embeddings: {str(e)}")
+            fetched = self._store_queries(missing, res.data)
+            vectors = [fetched[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+        return np.array(vectors, dtype=np.float32)
+
+    def query_embedding(self, query: str) -> np.ndarray:
+        return self._get_query_embeddings([query])[0]
+
+    async def aget_query_embeddings(self, queries: List[str]) -> np.ndarray:
+        """``_get_query_embeddings`` with uncached queries fetched by AsyncOpenAI."""
+        keys, vectors, missing = self._lookup_queries(queries)
+        if missing:
+            try:
+                res = await self.async_client.embeddings.create(
+                    input=missing,
+                    model=self.embedding_model
+                )
+            except Exception as e:
+                raise RuntimeError(f"Failed to get query embeddings: {str(e)}")
+            fetched = self._store_queries(missing, res.data)
+            vectors = [fetched[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+        return np.array(vectors, dtype=np.float32)
 
     def _get_keyword_scores(self, query: str) -> np.ndarray:
-        return np.array(self.bm25.get_scores(query.lower().split()))
+        return self.bm25.get_scores(query.lower().split())
+
+    def _get_keyword_scores_many(self, queries: List[str]) -> np.ndarray:
+        return self.bm25.get_scores_many([query.lower().split() for query in queries])
 
     def _get_graph_scores(self, query: str) -> np.ndarray:
-        query_entities = {ent.text.lower() for ent in self.nlp(query).ents}
-        scores = np.zeros(len(self.documents))
+        return self._get_graph_scores_many([query])[0]
+
+    def _get_graph_scores_many(self, queries: List[str]) -> np.ndarray:
+        # One batched NER pass, then two-hop propagation for every query at once
+        query_entities = [{ent.text.lower() for ent in doc.ents} for doc in self.nlp.pipe(queries)]
+        scores = self.knowledge_graph.scores_many(query_entities, len(self.chunks))
+        # Per-element normalization, as before batching: every chunk within
+        # two hops of a query entity scores 1
+        return np.sign(scores)
+
+    def _scoring_embeddings(
+        self,
+        queries: List[str],
+        config: SettingsConfig,
+        query_embeddings: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        # Fetched before taking the lock, so an embeddings request never
+        # holds up an ingest
+        if config.use_semantic and query_embeddings is None:
+            query_embeddings = self._get_query_embeddings(queries)
+        return query_embeddings
+
+    def _score_queries(
+        self,
+        queries: List[str],
+        config: SettingsConfig,
+        query_embeddings: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Fused hybrid scores, one row per query and one column per chunk."""
+        query_embeddings = self._scoring_embeddings(queries, config, query_embeddings)
+        with self._lock:
+            return self._score_locked(queries, query_embeddings, config)
+
+    def _score_locked(self, queries: List[str], query_embeddings: Optional[np.ndarray], config: SettingsConfig) -> np.ndarray:
+        scores = np.zeros((len(queries), len(self.chunks)))
+        weights_sum = 0
         
-        for query_entity in query_entities:
-            if query_entity in self.knowledge_graph:
-                # Find related entities within 2 hops
-                related_entities = set()
-                for node in nx.single_source_shortest_path_length(
-                    self.knowledge_graph, query_entity, cutoff=2
-                ).keys():
-                    related_entities.add(node)
-                
-                for entity in related_entities:
-                    if entity in self.entity_doc_map:
-                        doc_indices = self.entity_doc_map[entity]
-                        for doc_idx in doc_indices:
-                            # Weight by path length and edge weights
-                            try:
-                                path_length = nx.shortest_path_length(
-                                    self.knowledge_graph, 
-                                    query_entity, 
-                                    entity, 
-                                    weight='weight'
-                                )
-                                scores[doc_idx] += 1.0 / (1.0 + path_length)
-                            except nx.NetworkXNoPath:
-                                continue
+        # Semantic search: one gemv or gemm below the ANN threshold, an
+        # approximate candidate search with exact rerank above it
+        if config.use_semantic:
+            index = self.semantic.index_for(self._matrix)
+            if len(queries) == 1 and not index.approximate:
+                semantic_scores = self._get_semantic_scores(query_embeddings[0])
+            else:
+                semantic_scores = index.scores_many(query_embeddings)
+            scores += config.semantic_weight * semantic_scores
+            weights_sum += config.semantic_weight
         
-        return normalize(scores.reshape(-1, 1), norm='l2').flatten()
-    
-    def search(self, query: str, config: SettingsConfig, k: int = 3) -> List[Dict]:
-        if not query:
-            raise ValueError("Query cannot be empty")
+        # Keyword search
+        if config.use_keyword:
+            # Each score is normalized on its own (x / |x|), as before
+            # batching: a chunk counts once if it matches at all
+            keyword_scores = self._get_keyword_scores_many(queries)
+            scores += config.keyword_weight * np.sign(keyword_scores)
+            weights_sum += config.keyword_weight
+        
+        # Knowledge graph search
+        if config.use_knowledge_graph:
+            scores += config.knowledge_graph_weight * self._get_graph_scores_many(queries)
+            weights_sum += config.knowledge_graph_weight
+        
+        # Normalize final scores
+        if weights_sum > 0:
+            scores /= weights_sum
+        return scores
+
+    def _validate_search(self, config: SettingsConfig, k: int) -> None:
         if k < 1:
             raise ValueError("k must be positive")
         if not config.validate_weights():
             raise ValueError("SettingsConfig weights must sum to 1.0")
-        if not self.documents:
+        if not len(self.chunks):
             raise RuntimeError("No documents loaded")
 
+    def _top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def search(self, query: str, config: SettingsConfig, k: int = 3) -> List[Dict]:
+        if not query:
+            raise ValueError("Query cannot be empty")
+        self._validate_search(config, k)
+
         try:
-            scores = np.zeros(len(self.documents))
-            weights_sum = 0
-            
-            # Semantic search
-            if config.use_semantic:
-                if query in self.query_cache:
-                    query_embedding = self.query_cache[query]
-                else:
-                    query_embedding = self._get_embedding(query)
-                    self.query_cache[query] = query_embedding
-                
-                semantic_scores = self._get_semantic_scores(
-                    np.array(query_embedding).reshape(1, -1)
-                )
-                scores += config.semantic_weight * semantic_scores
-                weights_sum += config.semantic_weight
-            
-            # Keyword search
-            if config.use_keyword:
-                keyword_scores = self._get_keyword_scores(query)
-                scores += config.keyword_weight * normalize(
-                    keyword_scores.reshape(-1, 1), 
-                    norm='l2'
-                ).flatten()
-                weights_sum += config.keyword_weight
-            
-            # Knowledge graph search
-            if config.use_knowledge_graph:
-                graph_scores = self._get_graph_scores(query)
-                scores += config.knowledge_graph_weight * graph_scores  # Fixed attribute name
-                weights_sum += config.knowledge_graph_weight  # Fixed attribute name
-            
-            # Normalize final scores
-            if weights_sum > 0:
-                scores /= weights_sum
-            
-            # Get top k results
-            top_indices = np.argsort(-scores)[:k]
-            
-            results = []
-            for idx in top_indices:
-                result = {
-                    "metadata": self.metadata[idx],
-                    "similarity": float(scores[idx])
-                }
-                results.append(result)
-            
+            query_embeddings = self._scoring_embeddings([query], config)
+            # Results are built under the same lock as the scores, so the
+            # chunk ids still name the same chunks
+            with self._lock:
+                scores = self._score_locked([query], query_embeddings, config)[0]
+
+                results = []
+                for idx in self._top_k(scores, k):
+                    result = {
+                        "id": int(idx),
+                        "metadata": self.metadata[idx],
+                        "similarity": float(scores[idx])
+                    }
+                    results.append(result)
+
             return results
         except Exception as e:
             raise RuntimeError(f"Search failed: {str(e)}")
 
+    def search_many(
+        self,
+        queries: List[str],
+        config: SettingsConfig,
+        k: int = 3,
+        query_embeddings: Optional[np.ndarray] = None
+    ) -> List[Dict]:
+        """Top ``k`` chunks for each query, fused and deduplicated by chunk id.
+
+        A chunk hit by several queries keeps its best score; results are
+        ordered by that score. ``query_embeddings``, one row per query, skips
+        the query-embedding lookup.
+        """
+        keep = [i for i, query in enumerate(queries) if query]
+        queries = [queries[i] for i in keep]
+        if query_embeddings is not None:
+            query_embeddings = np.asarray(query_embeddings)[keep]
+        if not queries:
+            raise ValueError("Queries cannot be empty")
+        self._validate_search(config, k)
 
+        try:
+            query_embeddings = self._scoring_embeddings(queries, config, query_embeddings)
+            with self._lock:
+                scores = self._score_locked(queries, query_embeddings, config)
+
+                best = {}
+                for row in scores:
+                    for idx in self._top_k(row, k):
+                        idx = int(idx)
+                        if idx not in best or row[idx] > best[idx]:
+                            best[idx] = float(row[idx])
+
+                return [{
+                    "id": idx,
+                    "metadata": self.metadata[idx],
+                    "similarity": similarity
+                } for idx, similarity in sorted(best.items(), key=lambda item: -item[1])]
+        except Exception as e:
+            raise RuntimeError(f"Search failed: {str(e)}")
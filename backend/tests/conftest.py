@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+import spacy
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND, os.path.dirname(BACKEND)]
+
+from rag.embedding_cache import EmbeddingCache, content_hash  # noqa: E402
+from rag.query_cache import QueryEmbeddingCache  # noqa: E402
+from rag.similarity_matching import SimilarityMatching  # noqa: E402
+
+DIM = 32
+ENTITIES = {
+    "PERSON": ["alice", "bob", "carol"],
+    "GPE": ["paris", "berlin", "oslo"],
+    "ORG": ["acme", "globex"],
+}
+
+
+def vector(text: str) -> np.ndarray:
+    """Deterministic stand-in for an embedding of ``text``."""
+    rng = np.random.default_rng(int(content_hash(text)[:8], 16))
+    return rng.standard_normal(DIM).astype(np.float32)
+
+
+@pytest.fixture(scope="session")
+def nlp_model(tmp_path_factory) -> str:
+    """A small rule-based pipeline on disk, so no trained spaCy model is needed."""
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    ruler = nlp.add_pipe("entity_ruler", config={"phrase_matcher_attr": "LOWER"})
+    ruler.add_patterns([
+        {"label": label, "pattern": name} for label, names in ENTITIES.items() for name in names
+    ])
+    path = tmp_path_factory.mktemp("nlp") / "rules"
+    nlp.to_disk(path)
+    return str(path)
+
+
+@pytest.fixture
+def embedding_cache(tmp_path) -> EmbeddingCache:
+    return EmbeddingCache(str(tmp_path / "cache" / "embeddings.sqlite"))
+
+
+@pytest.fixture
+def make_index(tmp_path, nlp_model, embedding_cache):
+    """SimilarityMatching over ``tmp_path``; chunk and query vectors come from the caches."""
+    query_cache = QueryEmbeddingCache()
+
+    def make(name: str = "vector_db", **kwargs) -> SimilarityMatching:
+        return SimilarityMatching(
+            api_key="test",
+            db_path=str(tmp_path / name),
+            cache=embedding_cache,
+            nlp_model=nlp_model,
+            query_cache=query_cache,
+            **kwargs
+        )
+
+    return make
+
+
+@pytest.fixture
+def seed():
+    """Pre-fill an index's caches so indexing and searching make no API calls."""
+    def seed(index: SimilarityMatching, texts) -> None:
+        texts = list(texts)
+        vectors = [vector(text) for text in texts]
+        index.cache.put_embeddings(index.embedding_model, texts, vectors)
+        index.query_cache.put_many(index.embedding_model, texts, vectors)
+
+    return seed
+
+
+class EmbeddingServer(ThreadingHTTPServer):
+    """OpenAI-compatible /embeddings endpoint that records overlapping requests."""
+
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0.05):
+        super().__init__(("127.0.0.1", 0), EmbeddingHandler)
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class EmbeddingHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.active += 1
+            server.requests += 1
+            server.peak = max(server.peak, server.active)
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+
+        payload = json.dumps({
+            "object": "list",
+            "model": body["model"],
+            "data": [
+                {"object": "embedding", "index": i, "embedding": [float(len(text)), 1.0]}
+                for i, text in enumerate(body["input"])
+            ],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def server():
+    server = EmbeddingServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,45 @@
+import threading
+
+from rag.chunk_store import ChunkStore
+
+SPANS = 20000
+
+
+def test_concurrent_reads_do_not_drop_pending_rows():
+    chunks = ChunkStore()
+    doc_id = chunks.add_document("notes", "x" * SPANS)
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            chunks.rows
+            chunks.refs
+            len(chunks)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for i in range(SPANS):
+        chunks.add_spans(doc_id, [(i, i + 1, 1, i + 1, 0, 0)])
+        chunks.add_reference(0, doc_id, (i, i + 1, 1, i + 1, 0, 0))
+    done.set()
+    for reader in readers:
+        reader.join()
+
+    assert len(chunks) == SPANS
+    assert chunks.rows[:, 1].tolist() == list(range(SPANS))
+    assert len(chunks.references(0)) == SPANS
+
+
+def test_tail_returns_rows_added_since_positions():
+    chunks = ChunkStore()
+    chunks.add_items([{"title": "a - Chunk 1", "content": "alpha"}])
+    positions = chunks.positions()
+    chunks.add_items([{"title": "b - Chunk 1", "content": "beta"}])
+
+    titles, texts, rows, refs = chunks.tail(*positions)
+
+    assert titles == ["b"]
+    assert texts == ["beta"]
+    assert rows.tolist() == [[0, 0, 4, 0, 1, 0, 0]]
+    assert len(refs) == 0
@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from rag.embedding_client import AsyncEmbeddingClient, TokenBucket, get_rate_limits
+
+
+def test_concurrent_embeds_share_one_budget(server):
+    # Two sessions' clients, each embedding on its own event loop (embed_sync)
+    clients = [
+        AsyncEmbeddingClient("shared-budget-key", base_url=server.base_url, max_concurrency=2)
+        for _ in range(2)
+    ]
+
+    results = {}
+
+    def embed(idx):
+        texts = [f"session {idx} text {i}" for i in range(6)]
+        results[idx] = clients[idx].embed_sync(texts, batch_size=1)
+
+    threads = [threading.Thread(target=embed, args=(idx,)) for idx in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert server.requests == 12
+    assert server.peak <= 2
+    assert [vector[0] for vector in results[1]] == [float(len(f"session 1 text {i}")) for i in range(6)]
+    concurrency, _, _ = get_rate_limits("shared-budget-key", clients[0].model)
+    assert concurrency.limit == 2
+    assert concurrency.active == 0
+
+
+def test_token_bucket_reservations_queue_in_order():
+    bucket = TokenBucket(600)
+    assert bucket._reserve(600) == 0
+    # 10 units per second: the next 5 wait half a second, then 5 more a second
+    assert bucket._reserve(5) == pytest.approx(0.5, abs=0.01)
+    assert bucket._reserve(5) == pytest.approx(1.0, abs=0.01)
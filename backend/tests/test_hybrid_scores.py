@@ -0,0 +1,69 @@
+import networkx as nx
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from models.rag import SettingsConfig
+
+CHUNKS = [
+    "Alice moved from Paris to Berlin to work at Acme.",
+    "Bob met Carol in Oslo. The meeting was about budgets.",
+    "Acme and Globex share a building in Berlin.",
+    "Quarterly budgets are reviewed by the finance team.",
+    "Carol joined Globex last spring.",
+]
+
+QUERIES = ["where does alice work", "budgets meeting oslo", "globex building"]
+
+
+def build(make_index, seed):
+    index = make_index()
+    seed(index, [chunk.lower() for chunk in CHUNKS] + QUERIES)
+    index.add_documents([{"title": f"notes - Chunk {i + 1}", "content": text} for i, text in enumerate(CHUNKS)], persist=False)
+    return index
+
+
+def test_keyword_scores_match_per_element_baseline(make_index, seed):
+    index = build(make_index, seed)
+    config = SettingsConfig(use_semantic=False, use_knowledge_graph=False, keyword_weight=1.0)
+
+    scores = index._score_queries(QUERIES, config)
+
+    for query, row in zip(QUERIES, scores):
+        raw = index._get_keyword_scores(query)
+        expected = normalize(raw.reshape(-1, 1), norm='l2').flatten()
+        np.testing.assert_allclose(row, expected)
+
+
+def baseline_graph_scores(index, query):
+    """The networkx graph signal the pickle store used to compute, per query."""
+    graph, entity_doc_map = nx.Graph(), {}
+    for doc_idx, analysis in enumerate(index._analyze_texts([chunk.lower() for chunk in CHUNKS])):
+        for entity, label in analysis["entities"]:
+            graph.add_node(entity, label=label)
+            entity_doc_map.setdefault(entity, set()).add(doc_idx)
+        for sent_entities in analysis["sentences"]:
+            for i in range(len(sent_entities)):
+                for j in range(i + 1, len(sent_entities)):
+                    graph.add_edge(sent_entities[i], sent_entities[j], weight=1.0)
+
+    scores = np.zeros(len(CHUNKS))
+    for query_entity in {ent.text.lower() for ent in index.nlp(query).ents}:
+        if query_entity in graph:
+            related = nx.single_source_shortest_path_length(graph, query_entity, cutoff=2)
+            for entity in related:
+                for doc_idx in entity_doc_map.get(entity, ()):
+                    path_length = nx.shortest_path_length(graph, query_entity, entity, weight='weight')
+                    scores[doc_idx] += 1.0 / (1.0 + path_length)
+    return normalize(scores.reshape(-1, 1), norm='l2').flatten()
+
+
+def test_graph_scores_match_networkx_baseline(make_index, seed):
+    index = build(make_index, seed)
+    config = SettingsConfig(use_semantic=False, use_keyword=False, knowledge_graph_weight=1.0)
+
+    scores = index._score_queries(QUERIES, config)
+
+    for query, row in zip(QUERIES, scores):
+        expected = baseline_graph_scores(index, query)
+        assert expected.any()
+        np.testing.assert_allclose(row, expected)
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from managers.ingestion_manager import IngestionJob
+from rag.nlp import DEFAULT_BATCH_SIZE
+
+CHUNKS = 150
+
+
+def document(chunks: int = CHUNKS):
+    parts = [f"Paragraph {i} mentions Alice in Berlin. " for i in range(chunks)]
+    text, spans, start = "".join(parts), [], 0
+    for i, part in enumerate(parts):
+        spans.append((start, start + len(part), 8, i + 1, 0, 0))
+        start += len(part)
+    return {"title": "notes.txt", "text": text, "chunks": spans}
+
+
+def test_add_document_reports_every_embedding_request_and_analysis_batch(make_index, server):
+    index = make_index(dedup_threshold=1.01)
+    index.embedding_client.base_url = server.base_url
+    # Roughly 25 chunks per request
+    index.embedding_client.max_batch_tokens = 25 * index.embedding_client._count_tokens("paragraph 100 mentions alice in berlin. ")
+    events = []
+
+    index.add_document(document(), persist=False, progress=lambda *event: events.append(event))
+
+    embedding = [done for stage, done, total in events if stage == "embedding"]
+    analyzing = [done for stage, done, total in events if stage == "analyzing"]
+    assert all(total == CHUNKS for _, _, total in events)
+    assert server.requests >= 5
+    assert len(embedding) == server.requests + 1
+    assert embedding == sorted(embedding) and embedding[0] == 0 and embedding[-1] == CHUNKS
+    assert analyzing == [0] + list(range(DEFAULT_BATCH_SIZE, CHUNKS, DEFAULT_BATCH_SIZE)) + [CHUNKS]
+
+
+def job(sizes):
+    job = IngestionJob(
+        id="job",
+        session_id="session",
+        user_id="user",
+        files=[(f"/spool/{i}", f"file{i}.pdf") for i in range(len(sizes))],
+        bytes_total=sum(sizes),
+        file_sizes=list(sizes),
+        status="running"
+    )
+    job.started_at = time.monotonic() - 10
+    return job
+
+
+def test_eta_follows_batches_within_a_file():
+    ingest = job([1000, 1000])
+    ingest.record({"stage": "extracted", "file": "file0.pdf", "index": 0, "chunks": 100})
+    assert ingest.eta_seconds() is None
+
+    ingest.record({"stage": "embedding", "file": "file0.pdf", "index": 0, "done": 50, "total": 100})
+    # A quarter of the first file's work, an eighth of the job, in 10s
+    assert ingest.eta_seconds() == pytest.approx(70, rel=0.01)
+    assert ingest.chunks_embedded == 50
+
+    ingest.record({"stage": "embedding", "file": "file0.pdf", "index": 0, "done": 100, "total": 100})
+    ingest.record({"stage": "analyzing", "file": "file0.pdf", "index": 0, "done": 100, "total": 100})
+    assert ingest.eta_seconds() == pytest.approx(10, rel=0.01)
+    assert (ingest.chunks_embedded, ingest.chunks_analyzed) == (100, 100)
+
+    ingest.record({"stage": "indexed", "file": "file0.pdf", "index": 0, "chunks": 100, "entities": 3})
+    ingest.record({"stage": "extracted", "file": "file1.pdf", "index": 1, "chunks": 300})
+    # The second file turned out three times as long
+    assert ingest.eta_seconds() == pytest.approx(30, rel=0.01)
+    assert ingest.to_dict()["files_done"] == 1
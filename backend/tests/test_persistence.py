@@ -0,0 +1,57 @@
+import pytest
+import tiktoken
+
+from rag.similarity_matching import COMPACT_DELTAS
+
+
+def items(start: int, stop: int):
+    return [{"title": f"upload {i} - Chunk 1", "content": f"Note number {i} about Berlin."} for i in range(start, stop)]
+
+
+def seed_items(index, seed, stop: int) -> None:
+    seed(index, [item["content"].lower() for item in items(0, stop)])
+
+
+def test_reopened_store_keeps_uploads_across_compaction(make_index, seed):
+    total = 2 + COMPACT_DELTAS + 2
+    index = make_index()
+    seed_items(index, seed, total)
+    for item in items(0, 2):
+        index.add_documents([item])
+
+    reopened = make_index()
+    assert reopened.exists()
+    reopened.load_db()
+    assert len(reopened.chunks) == 2
+    # One delta per upload, so compaction runs part-way through
+    for item in items(2, total):
+        reopened.add_documents([item])
+    assert len(reopened.store.read_manifest()["deltas"]) < COMPACT_DELTAS
+
+    final = make_index()
+    final.load_db()
+    assert len(final.chunks) == total
+    assert [chunk["content"] for chunk in final.chunks] == [item["content"] for item in items(0, total)]
+    assert len(final.embeddings) == total
+    assert final.bm25.corpus_size == total
+
+
+@pytest.fixture
+def cl100k():
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        pytest.skip(f"cl100k_base encoding unavailable: {e}")
+
+
+def test_rag_system_opens_saved_session(tmp_path, monkeypatch, make_index, seed, cl100k):
+    from rag.rag_system import RagSystem
+
+    monkeypatch.chdir(tmp_path)
+    index = make_index("data/rag_sessions/s1/vector_db")
+    seed_items(index, seed, 3)
+    index.add_documents(items(0, 3))
+
+    rag = RagSystem(api_key="test", session_id="s1")
+
+    assert len(rag.vector_db.chunks) == 3
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from rich.console import Console
+
+from rag.IVFPQVectorDB import IVFPQVectorDB
+from rag.embedding_matrix import EmbeddingMatrix
+from rag.ivfpq import RawVectorStore, index_params
+from rag.semantic_index import IVFPQIndex, SemanticIndex
+
+DIM = 384
+
+
+def clustered(rng, centres, size):
+    labels = rng.integers(0, len(centres), size=size)
+    return centres[labels] + 0.3 * rng.standard_normal((size, centres.shape[1]), dtype=np.float32)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((32, DIM), dtype=np.float32)
+    return rng, centres, clustered(rng, centres, 4000), clustered(rng, centres, 20)
+
+
+def recall(index, matrix, queries, k=10):
+    expected = np.argsort(-SemanticIndex(matrix).scores_many(queries), axis=1)[:, :k]
+    actual = np.argsort(-index.scores_many(queries), axis=1)[:, :k]
+    return np.mean([len(set(a) & set(e)) / k for a, e in zip(actual, expected)])
+
+
+def test_ivfpq_index_sizes_like_ivfpq_vector_db(data):
+    _, _, corpus, _ = data
+    matrix = EmbeddingMatrix.from_array(corpus)
+    db = IVFPQVectorDB(api_key="offline", console=Console(quiet=True), d=DIM, cache=False)
+    db.add(corpus, [{}] * len(corpus))
+
+    index = IVFPQIndex(matrix, tuned_params={})
+
+    assert index.params == (db.pca_dimension, db.M, db.bits_per_subvector, db.nlist)
+    assert index.params == index_params(DIM, len(corpus))
+
+
+def test_ivfpq_index_uses_tuned_params_and_rerank_store(data):
+    _, _, corpus, queries = data
+    matrix = EmbeddingMatrix.from_array(corpus)
+    tuned = {"pca_dimension": 32, "nlist": 20, "M": 8, "bits": 8, "n_vectors": 2000, "nprobe": 8, "pre_k": 10}
+
+    index = IVFPQIndex(matrix, tuned_params=tuned, raw_dtype="int8")
+
+    assert index.params == (32, 8, 8, 40)
+    assert index.nprobe == 8
+    assert isinstance(index.raw_vectors, RawVectorStore)
+    assert len(index.raw_vectors) == len(corpus)
+    assert recall(index, matrix, queries) > 0.8
+
+
+def test_ivfpq_index_goes_stale_when_appends_drift(data):
+    rng, centres, corpus, _ = data
+    matrix = EmbeddingMatrix.from_array(corpus)
+    index = IVFPQIndex(matrix, tuned_params={})
+
+    matrix.append(clustered(rng, centres, 500))
+    index.sync()
+    assert not index.stale
+
+    # Rows from a distribution the PCA and codebooks never saw
+    matrix.append(rng.standard_normal((2000, DIM), dtype=np.float32))
+    index.sync()
+    assert index.size == len(matrix)
+    assert index.stale
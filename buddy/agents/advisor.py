@@ -175,7 +175,7 @@ class AdviseAgent(BaseAgent):
         Text: """ + text
 
         chat_history = [{"role": "user", "content": prompt}]
-        response = self.model.query(chat_history, response_format={"type": "json_object"})
+        response = self.model.query(chat_history, cache=True, response_format={"type": "json_object"})
         return json.loads(response)
 
     def gather_missing_requirements(self, requirements: dict) -> dict:
@@ -204,7 +204,7 @@ class AnalyzerAgent(BaseAgent):
                     {"role": "system", "content": system_prompts},
                     {"role": "user", "content": self.prompts[analysis_type]}
                 ]
-                insights = self.model.query(chat_history)
+                insights = self.model.query(chat_history, cache=True)
                 results.append(AnalysisResult(analysis_type, insights))
 
                 self.console.print(f"[green]✓[/green] Completed {analysis_type} analysis")
@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "BUDDY_LLM_CACHE", os.path.join(os.path.expanduser("~"), ".databuddy", "llm_cache.sqlite")
+)
+DEFAULT_CACHE_TTL = float(os.getenv("BUDDY_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def request_digest(request: Dict[str, Any]) -> str:
+    """sha256 of a chat request (model, messages and every other parameter)"""
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """On-disk cache of chat completion texts, keyed by the whole request.
+
+    Only call sites that opt in consult it, typically low-temperature helper
+    prompts that are re-issued with identical inputs. Entries older than
+    ``ttl`` seconds count as misses and are dropped; a ``ttl`` of 0 turns
+    the cache off.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = DEFAULT_CACHE_TTL):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "digest TEXT PRIMARY KEY, model TEXT, content TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.writes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, request: Dict[str, Any]) -> Optional[str]:
+        if not self.enabled:
+            return None
+        digest = request_digest(request)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, created FROM responses WHERE digest = ?", (digest,)
+            ).fetchone()
+            if row is not None and row[1] + self.ttl < time.time():
+                self._conn.execute("DELETE FROM responses WHERE digest = ?", (digest,))
+                self._conn.commit()
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, request: Dict[str, Any], content: Optional[str]) -> None:
+        if not self.enabled or content is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (digest, model, content, created) VALUES (?, ?, ?, ?)",
+                (request_digest(request), request.get("model"), content, time.time())
+            )
+            self._conn.commit()
+            self.writes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "writes": self.writes,
+            }
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path: Optional[str] = None) -> ResponseCache:
+    """Process-wide response cache for ``path`` (default: BUDDY_LLM_CACHE)."""
+    path = path or DEFAULT_CACHE_PATH
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path)
+        return _caches[path]
@@ -3,6 +3,7 @@ import json
 from typing import Dict, Any, Optional
 
 from buddy.function import get_function, process_function_name, SEARCH_FUNCTIONS
+from buddy.model.cache import get_response_cache
 
 class OpenAIModel:
     def __init__(self, api_key: str, parameters: Optional[Dict[str, Any]] = None):
@@ -13,13 +14,25 @@ class OpenAIModel:
         self.client = openai.Client(api_key=api_key)
         self.func_call_history = []
 
-    def query(self, chat_history, **kwargs):
+    def query(self, chat_history, cache: bool = False, **kwargs):
+        """
+        query: get the model's answer to the chat history.
+        Args:
+            chat_history (list): The messages so far.
+            cache (bool): Serve an identical earlier request from the response cache.
+                Opt in only where the same prompt is expected to recur.
+        """
         parameters = {
             "model": self.model_name,
             "temperature": self.temperature,
             "max_tokens": self.max_tokens,
             **kwargs
         }
+        request = {"messages": chat_history, **parameters}
+        if cache:
+            content = get_response_cache().get(request)
+            if content is not None:
+                return content
         
         completion = self.client.chat.completions.create(
             messages=chat_history,
@@ -42,4 +55,7 @@ class OpenAIModel:
             chat_history.append({"role": "function", "content": result, "name": function_name})
             return self.query(chat_history, **parameters)
         else:
+            # Answers that went through function calls are not cached
+            if cache:
+                get_response_cache().put(request, res.content)
             return res.content